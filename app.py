@@ -1,16 +1,29 @@
 import streamlit as st
-from PIL import Image
 import io
 import hashlib
-import base64
+import time
+import uuid
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-from platemaker_module import PlateMaker
-from google_drive_uploader import DriveUploader
+# platemaker_module (rembg, onnxruntime) and the Drive client are imported in
+# init_services, after the page header is already on screen
+from batch_manifest import BatchManifest
+from job_queue import JobQueue
+from preview_cache import PreviewCache
+from output_profiles import (
+    OUTPUT_PROFILES,
+    RENDITIONS,
+    encode_image,
+    get_rendition,
+    output_filename,
+    profile_for,
+    profile_mimetype,
+    rendition_folder,
+)
 
 st.set_page_config(page_title="Shobha Sarees Platemaker Dashboard", layout="wide")
 st.title("🎨 Shobha Sarees Platemaker Dashboard")
@@ -20,18 +33,77 @@ st.title("🎨 Shobha Sarees Platemaker Dashboard")
 # -----------------------------------------------------------------------------
 @st.cache_resource
 def init_services():
+    # Wall time of each startup step, shown in the startup report
+    timings = {}
     try:
-        platemaker = PlateMaker()
-        st.success("✅ PlateMaker initialized successfully")
-        drive_uploader = DriveUploader()
+        t0 = time.perf_counter()
+        from platemaker_module import PlateMaker
+        timings["import platemaker_module"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        # The model loads on a background thread while the page renders
+        platemaker = PlateMaker(load_in_background=True)
+        timings["PlateMaker()"] = time.perf_counter() - t0
+        st.success("✅ PlateMaker initialized successfully (model loading in the background)")
+
+        t0 = time.perf_counter()
+        from google_drive_uploader import DriveUploader
+        timings["import google_drive_uploader"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        drive_uploader = DriveUploader(prefetch_in_background=True)
+        timings["DriveUploader()"] = time.perf_counter() - t0
         st.success("✅ DriveUploader initialized successfully")
-        return platemaker, drive_uploader
+        logger.info(
+            "⏱️ Startup: " + ", ".join(f"{name} {secs:.2f}s" for name, secs in timings.items())
+        )
+        return platemaker, drive_uploader, timings
     except Exception as e:
         st.error(f"❌ Failed to initialize services: {str(e)}")
         logger.error("Failed to initialize services", exc_info=True)
         st.stop()
 
-platemaker, drive_uploader = init_services()
+platemaker, drive_uploader, startup_timings = init_services()
+
+@st.cache_resource
+def init_job_queue():
+    # Shared by every session; batches run here instead of in the script thread.
+    # The manifest lets a re-submitted batch redo only failed/unfinished items.
+    return JobQueue(platemaker, drive_uploader, manifest=BatchManifest())
+
+job_queue = init_job_queue()
+
+@st.cache_resource
+def init_preview_cache():
+    # Thumbnails survive reruns, so editing a cell does not re-decode uploads
+    return PreviewCache()
+
+preview_cache = init_preview_cache()
+
+def startup_report():
+    """Rows for the startup timing table; background steps still running show as None"""
+    rows = [{"step": step, "seconds": round(secs, 3)} for step, secs in startup_timings.items()]
+    model_loaded = platemaker.ready
+    for key, label in (
+        ("import_s", "model: import rembg/onnxruntime"),
+        ("session_create_s", f"model: create {platemaker.MODEL_NAME} session"),
+        ("warmup_s", "model: warm-up"),
+    ):
+        secs = platemaker.startup_timings[key]
+        rows.append({"step": label, "seconds": round(secs, 3) if model_loaded else None})
+    for key, label in (
+        ("auth_s", "drive: credentials"),
+        ("build_service_s", "drive: build client (bundled discovery)"),
+        ("prefetch_folders_s", "drive: prefetch catalog folders"),
+    ):
+        secs = drive_uploader.startup_timings[key]
+        rows.append({"step": label, "seconds": round(secs, 3) if secs is not None else None})
+    return rows
+
+if not platemaker.ready:
+    st.info("🧠 Segmentation model is still loading; processing starts as soon as it is ready.")
+with st.expander("⏱️ Startup timings", expanded=False):
+    st.dataframe(startup_report(), hide_index=True, width="stretch")
 
 # -----------------------------------------------------------------------------
 # Constants
@@ -46,6 +118,9 @@ CATALOG_OPTIONS = [
     "Shakuntala",
 ]
 DEFAULT_SUGGEST_START = 4000
+# First choice in the output profile pickers: use each catalog's own profile
+PROFILE_PER_CATALOG = "Per-catalog default"
+PROFILE_CHOICES = [PROFILE_PER_CATALOG] + list(OUTPUT_PROFILES)
 
 # -----------------------------------------------------------------------------
 # Session state init
@@ -59,10 +134,25 @@ if "batch_row_order" not in st.session_state:
     st.session_state["batch_row_order"] = []
 if "batch_results" not in st.session_state:
     st.session_state["batch_results"] = None
+if "batch_summary" not in st.session_state:
+    # Outcome of the last finished job; outlives the rerun that ends its progress view
+    st.session_state["batch_summary"] = None
 if "batch_editor_version" not in st.session_state:
     st.session_state["batch_editor_version"] = 0
 if "batch_base_number" not in st.session_state:
     st.session_state["batch_base_number"] = DEFAULT_SUGGEST_START
+if "batch_job_id" not in st.session_state:
+    st.session_state["batch_job_id"] = None
+
+# Batch jobs are tagged with a key kept in the URL, so a refreshed page
+# (a new session) can find its running job again
+if "owner" not in st.query_params:
+    st.query_params["owner"] = uuid.uuid4().hex[:12]
+batch_owner = st.query_params["owner"]
+if st.session_state["batch_job_id"] is None:
+    active = [j for j in job_queue.jobs(owner=batch_owner) if j["state"] in ("queued", "running")]
+    if active:
+        st.session_state["batch_job_id"] = max(active, key=lambda j: j["created"])["id"]
 
 # Simple mode
 if "simple_design_numbers" not in st.session_state:
@@ -80,50 +170,60 @@ def file_uid(f):
     except Exception:
         return f"{f.name}:{getattr(f, 'size', 'na')}"
 
-def make_preview_data_url(uploaded_file, max_size=(140, 140), quality=60):
-    try:
-        uploaded_file.seek(0)
-        img = Image.open(uploaded_file).convert("RGB")
-        img.thumbnail(max_size)
-        buf = io.BytesIO()
-        img.save(buf, format="JPEG", quality=quality)
-        b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
-        uploaded_file.seek(0)
-        return f"data:image/jpeg;base64,{b64}"
-    except Exception:
-        uploaded_file.seek(0)
-        return ""
+def selected_profile(key):
+    """Profile name chosen in a picker, or None to use the catalog's default"""
+    choice = st.session_state.get(key, PROFILE_PER_CATALOG)
+    return None if choice == PROFILE_PER_CATALOG else choice
 
 def derive_fields(catalog, dn):
     dn_s = str(dn).strip()
     banner = f"{catalog} 6.30 D.No {dn_s}" if catalog and dn_s else ""
-    output = f"{catalog} - {dn_s}.jpg" if catalog and dn_s else ""
+    profile = profile_for(catalog, selected_profile("batch_profile"))
+    output = output_filename(catalog, dn_s, profile) if catalog and dn_s else ""
     folder = f"Shobha Sarees/{catalog}/" if catalog else ""
     return banner, output, folder
 
-def process_and_upload_image(uploaded_file, catalog, design_number, status_cb):
+def process_and_upload_image(uploaded_file, catalog, design_number, status_cb, profile=None,
+                             renditions=()):
+    """Process one plate and upload it plus its renditions; returns (filename, url, rendition_urls)"""
     try:
-        uploaded_file.seek(0)
+        profile = profile_for(catalog, profile)
         status_cb("🚀 Starting processing...")
+        # getvalue() shares the upload's buffer; no seek/read copy
         processed_img = platemaker.process_image(
-            uploaded_file,
+            uploaded_file.getvalue(),
             catalog,
             design_number,
             status_callback=status_cb,
         )
-        output_filename = f"{catalog} - {design_number}.jpg"
+        filename = output_filename(catalog, design_number, profile)
         status_cb("💾 Converting to upload format...")
-        img_bytes = io.BytesIO()
-        processed_img.save(img_bytes, format="JPEG", quality=100)
-        img_bytes.seek(0)
-        status_cb("☁️ Uploading to Google Drive...")
+        data, encode_stats = encode_image(processed_img, profile)
+        status_cb(
+            f"☁️ Uploading to Google Drive ({encode_stats['bytes'] / 1e6:.1f} MB {profile}, "
+            f"encoded in {encode_stats['encode_s']:.1f}s)..."
+        )
         drive_url = drive_uploader.upload_image(
-            img_bytes,
-            output_filename,
+            io.BytesIO(data),
+            filename,
             catalog,
+            mimetype=profile_mimetype(profile),
         )
-        status_cb("✅ Uploaded • [Drive](" + drive_url + ")")
-        return output_filename, drive_url
+        rendition_urls = {}
+        if renditions:
+            status_cb("🖼️ Uploading extra sizes...")
+            extra = platemaker.encode_renditions(processed_img, renditions, catalog)
+            for name, rendition in extra.items():
+                r_profile = get_rendition(name)["profile"]
+                rendition_urls[name] = drive_uploader.upload_image(
+                    io.BytesIO(rendition["image_bytes"]),
+                    output_filename(catalog, design_number, r_profile),
+                    rendition_folder(catalog, name),
+                    mimetype=profile_mimetype(r_profile),
+                )
+        links = "".join(f" • [{n}]({u})" for n, u in rendition_urls.items())
+        status_cb("✅ Uploaded • [Drive](" + drive_url + ")" + links)
+        return filename, drive_url, rendition_urls
     except Exception as e:
         logger.error(f"Error in process_and_upload_image: {e}", exc_info=True)
         raise
@@ -156,13 +256,14 @@ with tab_batch:
         # Sync rows to uploads (start empty per row)
         current_uids = []
         if batch_files:
-            for uf in batch_files:
-                uid = file_uid(uf)
+            uids = [file_uid(uf) for uf in batch_files]
+            new_files = {uid: uf for uid, uf in zip(uids, batch_files) if uid not in st.session_state["batch_rows"]}
+            previews = preview_cache.data_urls(new_files)
+            for uid in uids:
                 current_uids.append(uid)
                 if uid not in st.session_state["batch_rows"]:
-                    preview = make_preview_data_url(uf)
                     st.session_state["batch_rows"][uid] = {
-                        "preview": preview,
+                        "preview": previews.get(uid, ""),
                         "catalog": "",
                         "design_number": "",
                         "banner_preview": "",
@@ -313,6 +414,21 @@ with tab_batch:
             )
 
         st.divider()
+        st.selectbox(
+            "Output profile",
+            PROFILE_CHOICES,
+            index=0,
+            help="Encoder settings for this batch; smaller profiles upload faster.",
+            key="batch_profile",
+        )
+        st.multiselect(
+            "Extra sizes",
+            list(RENDITIONS),
+            default=[],
+            format_func=lambda n: f"{n} ({RENDITIONS[n]['max_side']}px)",
+            help="Smaller copies of each plate, uploaded to sibling folders next to the catalog folder.",
+            key="batch_renditions",
+        )
         if st.button("🚀 Process & Upload (Batch)", type="primary", width="stretch", key="batch_submit"):
             if not batch_files:
                 st.error("❌ Please upload at least one image first.")
@@ -335,72 +451,129 @@ with tab_batch:
                 if missing:
                     st.error("❌ Please complete required fields:\n- " + "\n- ".join(missing))
                 else:
-                    boxes = [st.empty() for _ in batch_files]
-                    progress = st.progress(0.0)
-                    results = []
-
-                    for idx, uf in enumerate(batch_files):
-                        uid = file_uid(uf)
-                        info = per_uid[uid]
-                        cat = info["catalog"]
-                        dn = info["design_number"]
-                        box = boxes[idx]
-
-                        def cb(msg, i=idx, b=box):
-                            b.markdown(f"Image {i+1}: {msg}")
-                            logger.info(f"Image {i+1}: {msg}")
-
-                        try:
-                            # Debug: File info
-                            st.write(f"🔍 Processing file: {uf.name}, Size: {uf.size} bytes")
-                            # Ensure file pointer is at start
-                            uf.seek(0)
-                            # Debug: Read file
-                            file_bytes = uf.read()
-                            st.write(f"✅ Read {len(file_bytes)} bytes from file")
-                            # Reset file pointer for processing
-                            uf.seek(0)
-                            filename, url = process_and_upload_image(uf, cat, dn, cb)
-                            box.markdown(f"Image {idx+1}: ✅ Uploaded • [Drive]({url})")
-                            results.append({"filename": filename, "catalog": cat, "url": url, "status": "success"})
-                        except Exception as e:
-                            error_msg = f"❌ Error processing {uf.name}: {str(e)}"
-                            box.error(f"Image {idx+1}: {error_msg}")
-                            st.error(error_msg)
-                            logger.error(error_msg, exc_info=True)
-                            results.append({"filename": f"Image {idx+1}", "catalog": cat, "url": None, "status": "error", "error": str(e)})
-
-                        progress.progress((idx + 1) / len(batch_files))
-
-                    successful = [r for r in results if r["status"] == "success"]
-                    failed = [r for r in results if r["status"] == "error"]
-
-                    if successful:
-                        st.toast("Batch upload complete", icon="✅")
-                        st.success(f"✅ Successfully processed {len(successful)} image(s)!")
-                        for r in successful:
-                            st.success(f"📁 {r['filename']} → `Shobha Sarees/{r['catalog']}/` • [Drive]({r['url']})")
-                    if failed:
-                        st.error(f"❌ Failed to process {len(failed)} image(s):")
-                        for r in failed:
-                            st.error(f"• {r['filename']} → {r.get('error', 'Unknown error')}")
-
-                    st.session_state["batch_results"] = results
-                    if results and all(r["status"] == "success" for r in results):
-                        st.balloons()
-                    st.rerun()
+                    # Hand the bytes to a background job; the script run ends right away
+                    job_items = []
+                    for uf in batch_files:
+                        info = per_uid[file_uid(uf)]
+                        job_items.append({
+                            "name": uf.name,
+                            "image_bytes": uf.getvalue(),
+                            "catalog": info["catalog"],
+                            "design_number": info["design_number"],
+                        })
+                    st.session_state["batch_job_id"] = job_queue.submit(
+                        job_items, owner=batch_owner, profile=selected_profile("batch_profile"),
+                        renditions=st.session_state.get("batch_renditions") or (),
+                    )
+                    st.session_state["batch_results"] = None
+                    st.session_state["batch_summary"] = None
+                    st.toast("Batch queued", icon="📥")
+
+        @st.fragment(run_every=2)
+        def batch_job_progress():
+            job_id = st.session_state.get("batch_job_id")
+            job = job_queue.status(job_id) if job_id else None
+            if not job:
+                return
+
+            st.subheader(f"Batch job `{job['id']}`")
+            st.progress(job["done"] / job["total"] if job["total"] else 1.0)
+            for idx, item in enumerate(job["items"]):
+                if item["status"] == "error":
+                    st.error(f"Image {idx+1}: ❌ Error processing {item['name']}: {item['error']}")
+                else:
+                    st.markdown(f"Image {idx+1}: {item['message']}")
+
+            if job["state"] in ("queued", "running"):
+                st.caption("⏳ Running in the background — you can keep editing or come back later.")
+                return
+
+            results = []
+            for idx, item in enumerate(job["items"]):
+                if item["status"] == "success":
+                    results.append({"filename": item["filename"], "catalog": item["catalog"], "url": item["url"],
+                                    "rendition_urls": item["rendition_urls"], "status": "success"})
+                else:
+                    results.append({"filename": f"Image {idx+1} ({item['name']})", "catalog": item["catalog"],
+                                    "url": None, "status": "error", "error": item["error"]})
+
+            # Shown in the Drive links tab; the rerun below clears this fragment
+            st.session_state["batch_summary"] = {
+                "job_id": job["id"],
+                "succeeded": sum(r["status"] == "success" for r in results),
+                "failed": sum(r["status"] == "error" for r in results),
+                "upload_stats": job["upload_stats"],
+                "announce": True,
+            }
+            st.session_state["batch_results"] = results
+            st.session_state["batch_job_id"] = None
+            st.rerun()
+
+        batch_job_progress()
 
     # Hidden links tab shows only after a run
     if has_results and links_tab is not None:
         with links_tab:
+            summary = st.session_state.get("batch_summary")
+            if summary:
+                if summary.pop("announce", False):
+                    if summary["succeeded"]:
+                        st.toast("Batch upload complete", icon="✅")
+                    if not summary["failed"]:
+                        st.balloons()
+                if summary["succeeded"]:
+                    st.success(f"✅ Successfully processed {summary['succeeded']} image(s)!")
+                if summary["failed"]:
+                    st.error(
+                        f"❌ Failed to process {summary['failed']} image(s). "
+                        "Press Process & Upload again to retry only these."
+                    )
+                stats = summary["upload_stats"]
+                if stats and stats["files"]:
+                    caption = (
+                        f"📊 Uploaded {stats['bytes'] / 1e6:.1f} MB in {stats['elapsed_s']:.1f}s "
+                        f"({stats['mb_per_s']:.2f} MB/s)"
+                    )
+                    if stats.get("skipped"):
+                        caption += (
+                            f" • {stats['skipped']} unchanged file(s) already on Drive, "
+                            f"{stats['bytes_saved'] / 1e6:.1f} MB saved"
+                        )
+                    st.caption(caption)
+
             st.subheader("Drive links")
             results = st.session_state.get("batch_results") or []
             success_rows = [r for r in results if r.get("status") == "success"]
             if success_rows:
                 for r in success_rows:
-                    st.write(f"• {r['filename']} → [Drive]({r['url']})")
+                    extra = "".join(f" • [{n}]({u})" for n, u in r.get("rendition_urls", {}).items())
+                    st.write(f"• {r['filename']} → [Drive]({r['url']}){extra}")
             else:
                 st.info("No successful uploads in last run.")
+            failed_rows = [r for r in results if r.get("status") == "error"]
+            if failed_rows:
+                st.subheader("Failed")
+                for r in failed_rows:
+                    st.write(f"• {r['filename']} ({r['catalog']}): ❌ {r['error']}")
+
+    stage_summary = platemaker.recorder.summary()
+    if stage_summary:
+        with st.expander("📊 Pipeline stage timings", expanded=False):
+            st.dataframe(
+                [
+                    {
+                        "stage": name,
+                        "count": s["count"],
+                        "p50 (s)": round(s["p50_s"], 3),
+                        "p99 (s)": round(s["p99_s"], 3),
+                        "CPU total (s)": round(s["cpu_sum_s"], 2),
+                        "errors": s["errors"],
+                    }
+                    for name, s in stage_summary.items()
+                ],
+                hide_index=True,
+                width="stretch",
+            )
 
 # =============================================================================
 # Simple Mode (unchanged processing flow)
@@ -413,6 +586,21 @@ with tab_simple:
         index=0,
         key="simple_catalog",
     )
+    st.selectbox(
+        "Output profile",
+        PROFILE_CHOICES,
+        index=0,
+        help="Encoder settings for these uploads; smaller profiles upload faster.",
+        key="simple_profile",
+    )
+    st.multiselect(
+        "Extra sizes",
+        list(RENDITIONS),
+        default=[],
+        format_func=lambda n: f"{n} ({RENDITIONS[n]['max_side']}px)",
+        help="Smaller copies of each plate, uploaded to sibling folders next to the catalog folder.",
+        key="simple_renditions",
+    )
 
     st.subheader("Upload Saree Images")
     simple_files = st.file_uploader(
@@ -427,14 +615,16 @@ with tab_simple:
 
     if simple_files:
         st.subheader("📸 Preview Images & Set Design Numbers")
+        simple_uids = [file_uid(uf) for uf in simple_files]
+        simple_previews = preview_cache.get_many(dict(zip(simple_uids, simple_files)), max_size=(800, 800), quality=80)
         for idx, uploaded_file in enumerate(simple_files):
             col1, col2 = st.columns([1, 1])
             with col1:
-                try:
-                    image = Image.open(uploaded_file)
-                    st.image(image, width="stretch")
-                except Exception as e:
-                    st.warning(f"Could not preview Image {idx + 1}: {uploaded_file.name} ({e})")
+                preview = simple_previews.get(simple_uids[idx])
+                if preview:
+                    st.image(preview, width="stretch")
+                else:
+                    st.warning(f"Could not preview Image {idx + 1}: {uploaded_file.name}")
                 st.caption(f"Image {idx + 1}: {uploaded_file.name}")
 
             with col2:
@@ -448,7 +638,10 @@ with tab_simple:
 
                 if selected_catalog and design_number:
                     banner_preview = f"{selected_catalog} 6.30 D.No {design_number}"
-                    output_name = f"{selected_catalog} - {design_number}.jpg"
+                    output_name = output_filename(
+                        selected_catalog, design_number,
+                        profile_for(selected_catalog, selected_profile("simple_profile")),
+                    )
                     st.info(
                         f"**Banner Text:** `{banner_preview}`\n"
                         f"**File:** `{output_name}`\n"
@@ -481,16 +674,15 @@ with tab_simple:
                         logger.info(f"Simple Mode Image {i+1}: {msg}")
 
                     try:
-                        # Debug: File info
-                        st.write(f"🔍 Processing file: {uploaded_file.name}, Size: {uploaded_file.size} bytes")
-                        uploaded_file.seek(0)
-                        file_bytes = uploaded_file.read()
-                        st.write(f"✅ Read {len(file_bytes)} bytes from file")
-                        uploaded_file.seek(0)
+                        logger.info(f"Processing file: {uploaded_file.name}, Size: {uploaded_file.size} bytes")
                         dn = st.session_state["simple_design_numbers"][idx]
-                        filename, url = process_and_upload_image(uploaded_file, selected_catalog, dn, cb)
+                        filename, url, rendition_urls = process_and_upload_image(
+                            uploaded_file, selected_catalog, dn, cb, profile=selected_profile("simple_profile"),
+                            renditions=st.session_state.get("simple_renditions") or (),
+                        )
                         box.markdown(f"**Image {idx + 1}:** ✅ Successfully uploaded • [Drive]({url})")
-                        results.append({"filename": filename, "catalog": selected_catalog, "url": url, "status": "success"})
+                        results.append({"filename": filename, "catalog": selected_catalog, "url": url,
+                                        "rendition_urls": rendition_urls, "status": "success"})
                     except Exception as e:
                         error_msg = f"❌ Error processing {uploaded_file.name}: {str(e)}"
                         box.error(f"**Image {idx + 1}:** {error_msg}")
@@ -509,7 +701,8 @@ with tab_simple:
                     st.toast("Batch upload complete", icon="✅")
                     st.success(f"✅ Successfully processed {len(successful)} image(s)!")
                     for r in successful:
-                        st.success(f"📁 **{r['filename']}** → `Shobha Sarees/{r['catalog']}/` • [Drive]({r['url']})")
+                        extra = "".join(f" • [{n}]({u})" for n, u in r["rendition_urls"].items())
+                        st.success(f"📁 **{r['filename']}** → `Shobha Sarees/{r['catalog']}/` • [Drive]({r['url']}){extra}")
 
                 if failed:
                     st.error(f"❌ Failed to process {len(failed)} image(s):")
@@ -0,0 +1,125 @@
+import io
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from PIL import Image, ImageFont
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LRUDict:
+    """Small thread-safe LRU mapping with a fixed number of entries"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class AssetCache:
+    """Loads the logo and font once and memoizes their derived variants.
+
+    Logo variants are keyed by (target width, opacity) and fonts by point
+    size, so repeated plates do no asset I/O or decoding.
+    """
+
+    def __init__(self, logo_path, font_path, fallback_fonts=(), max_logos=16, max_fonts=64):
+        self.logo_path = logo_path
+        self.font_path = font_path
+        self.fallback_fonts = fallback_fonts
+        self._lock = threading.Lock()
+        self._logo = None
+        self._font_bytes = None
+        self._logos = LRUDict(max_logos)
+        self._fonts = LRUDict(max_fonts)
+
+    def base_logo(self):
+        """The decoded RGBA logo, read from disk on first use"""
+        if self._logo is None:
+            with self._lock:
+                if self._logo is None:
+                    logo = Image.open(self.logo_path).convert("RGBA")
+                    logo.load()
+                    self._logo = logo
+                    logger.info(f"🖼️ Loaded logo {self.logo_path}: {logo.size}")
+        return self._logo
+
+    def faded_logo(self, target_w, opacity):
+        """Logo resized to target_w with its alpha scaled by opacity"""
+        key = (target_w, opacity)
+        logo = self._logos.get(key)
+        if logo is not None:
+            return logo
+
+        base = self.base_logo()
+        scale = target_w / base.width
+        logo = base.resize(
+            (target_w, int(base.height * scale)),
+            Image.Resampling.LANCZOS
+        )
+        # Same table Image.point would build from lambda p: int(p * opacity)
+        lut = [int(p * opacity) for p in range(256)]
+        logo.putalpha(logo.getchannel("A").point(lut))
+        self._logos.put(key, logo)
+        return logo
+
+    def _read_font_bytes(self):
+        if self._font_bytes is None:
+            with self._lock:
+                if self._font_bytes is None and Path(self.font_path).exists():
+                    self._font_bytes = Path(self.font_path).read_bytes()
+        return self._font_bytes
+
+    def font(self, pts):
+        """FreeTypeFont at pts, parsed once per size"""
+        font = self._fonts.get(pts)
+        if font is None:
+            font = self._load_font(pts)
+            self._fonts.put(pts, font)
+        return font
+
+    def _load_font(self, pts):
+        data = self._read_font_bytes()
+        if data is not None:
+            try:
+                return ImageFont.truetype(
+                    io.BytesIO(data), pts,
+                    layout_engine=ImageFont.LAYOUT_RAQM,
+                    font_variation={"wght":800,"ital":1}
+                )
+            except Exception:
+                try:
+                    return ImageFont.truetype(io.BytesIO(data), pts)
+                except Exception:
+                    pass
+        for fb in self.fallback_fonts:
+            try:
+                return ImageFont.truetype(fb, pts)
+            except OSError:
+                continue
+        return ImageFont.load_default()
+
+    def stats(self):
+        return {"logo_variants": len(self._logos), "fonts": len(self._fonts)}
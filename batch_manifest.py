@@ -0,0 +1,227 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Stages an item moves through; "failed" rows keep the last stage reached
+STAGE_QUEUED = "queued"
+STAGE_PROCESSED = "processed"
+STAGE_UPLOADED = "uploaded"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    item_key      TEXT PRIMARY KEY,
+    batch_id      TEXT,
+    name          TEXT,
+    input_hash    TEXT NOT NULL,
+    catalog       TEXT NOT NULL,
+    design_number TEXT NOT NULL,
+    profile       TEXT,
+    stage         TEXT NOT NULL,
+    failed        INTEGER NOT NULL DEFAULT 0,
+    error         TEXT,
+    local_path    TEXT,
+    output_file   TEXT,
+    drive_url     TEXT,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    updated       REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_batch ON items (batch_id);
+CREATE INDEX IF NOT EXISTS items_hash ON items (input_hash);
+CREATE TABLE IF NOT EXISTS files (
+    item_key      TEXT NOT NULL,
+    rendition     TEXT NOT NULL,
+    local_path    TEXT,
+    output_file   TEXT,
+    drive_url     TEXT,
+    updated       REAL NOT NULL,
+    PRIMARY KEY (item_key, rendition)
+);
+"""
+
+
+def input_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class BatchManifest:
+    """Persistent per-item checkpoints for batch runs, stored in SQLite.
+
+    Items are keyed by input hash, catalog, design number and output
+    profile, so re-submitting the same files resumes where the last run
+    stopped: uploaded items are skipped, processed items are uploaded from
+    the plate staged on disk, and only failed or unfinished items are
+    processed again. Each output file of an item (the plate, rendition
+    None, and its renditions) is staged and checkpointed separately in
+    the files table, so a partly uploaded item only sends what is missing.
+    """
+
+    def __init__(self, db_path="batch_manifest.sqlite3", staging_dir=".batch_outputs"):
+        self.db_path = str(db_path)
+        self.staging_dir = Path(staging_dir)
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def item_key(input_hash, catalog, design_number, profile=None, renditions=()):
+        parts = [input_hash, catalog, str(design_number), profile or ""]
+        if renditions:
+            # Only appended when set, so keys of plain items stay unchanged
+            parts.append("+".join(sorted(renditions)))
+        raw = "\0".join(parts)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+    def get(self, item_key):
+        """The item's row as a dict, or None"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM items WHERE item_key = ?", (item_key,)).fetchone()
+        return dict(row) if row else None
+
+    def find_by_hash(self, input_hash):
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("SELECT * FROM items WHERE input_hash = ?", (input_hash,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def batch_items(self, batch_id):
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("SELECT * FROM items WHERE batch_id = ?", (batch_id,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def _write(self, sql, params):
+        with self._lock, self._connect() as conn:
+            conn.execute(sql, params)
+
+    def record_queued(self, item_key, batch_id, name, input_hash, catalog, design_number, profile=None):
+        """Register an item for a run; existing checkpoints are kept"""
+        self._write(
+            """INSERT INTO items (item_key, batch_id, name, input_hash, catalog, design_number,
+                                  profile, stage, updated)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(item_key) DO UPDATE SET
+                   batch_id = excluded.batch_id, name = excluded.name,
+                   attempts = attempts + 1, updated = excluded.updated""",
+            (item_key, batch_id, name, input_hash, catalog, str(design_number), profile,
+             STAGE_QUEUED, time.time()),
+        )
+
+    def _stage(self, item_key, rendition, data, extension):
+        name = f"{item_key}.{rendition}.{extension}" if rendition else f"{item_key}.{extension}"
+        path = self.staging_dir / name
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        return str(path)
+
+    def record_processed(self, item_key, plate_bytes, extension, renditions=None):
+        """Stage the encoded plate on disk so an upload retry needs no reprocessing.
+
+        renditions maps rendition name -> (encoded bytes, extension); they are
+        staged as encoded, since re-deriving them from the lossy plate gives
+        different bytes and defeats the unchanged-file check on Drive.
+        """
+        now = time.time()
+        staged = {None: self._stage(item_key, None, plate_bytes, extension)}
+        for name, (data, ext) in (renditions or {}).items():
+            staged[name] = self._stage(item_key, name, data, ext)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE items SET stage = ?, failed = 0, error = NULL, local_path = ?, updated = ? WHERE item_key = ?",
+                (STAGE_PROCESSED, staged[None], now, item_key),
+            )
+            conn.executemany(
+                """INSERT INTO files (item_key, rendition, local_path, updated) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(item_key, rendition) DO UPDATE SET
+                       local_path = excluded.local_path, updated = excluded.updated""",
+                [(item_key, name or "", path, now) for name, path in staged.items()],
+            )
+        return staged[None]
+
+    def record_file_uploaded(self, item_key, rendition, output_file, drive_url):
+        """Checkpoint one uploaded file of an item (rendition None is the plate)"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT local_path FROM files WHERE item_key = ? AND rendition = ?",
+                (item_key, rendition or ""),
+            ).fetchone()
+        self._write(
+            """INSERT INTO files (item_key, rendition, output_file, drive_url, updated)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(item_key, rendition) DO UPDATE SET local_path = NULL,
+                   output_file = excluded.output_file, drive_url = excluded.drive_url,
+                   updated = excluded.updated""",
+            (item_key, rendition or "", output_file, drive_url, time.time()),
+        )
+        if row and row[0]:
+            try:
+                os.remove(row[0])
+            except OSError:
+                pass
+
+    def uploaded_files(self, item_key):
+        """{rendition (None for the plate): {"output_file", "drive_url"}} already on Drive"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT rendition, output_file, drive_url FROM files WHERE item_key = ? AND drive_url IS NOT NULL",
+                (item_key,),
+            ).fetchall()
+        return {r or None: {"output_file": f, "drive_url": u} for r, f, u in rows}
+
+    def staged_files(self, item_key):
+        """{rendition (None for the plate): path} for staged files still on disk"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT rendition, local_path FROM files WHERE item_key = ? AND local_path IS NOT NULL",
+                (item_key,),
+            ).fetchall()
+        return {r or None: path for r, path in rows if os.path.exists(path)}
+
+    def record_uploaded(self, item_key, output_file, drive_url):
+        row = self.get(item_key)
+        with self._connect() as conn:
+            staged = [p for (p,) in conn.execute(
+                "SELECT local_path FROM files WHERE item_key = ? AND local_path IS NOT NULL", (item_key,)
+            )]
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                """UPDATE items SET stage = ?, failed = 0, error = NULL, local_path = NULL,
+                                    output_file = ?, drive_url = ?, updated = ? WHERE item_key = ?""",
+                (STAGE_UPLOADED, output_file, drive_url, time.time(), item_key),
+            )
+            conn.execute("UPDATE files SET local_path = NULL WHERE item_key = ?", (item_key,))
+        # Staged files are only needed until Drive has them
+        if row and row.get("local_path"):
+            staged.append(row["local_path"])
+        for path in set(staged):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def record_failed(self, item_key, error):
+        """Mark the item failed, keeping the stage it reached"""
+        self._write(
+            "UPDATE items SET failed = 1, error = ?, updated = ? WHERE item_key = ?",
+            (str(error), time.time(), item_key),
+        )
+
+    def staged_plate(self, row):
+        """Bytes of a processed item's staged plate, or None if missing"""
+        path = row.get("local_path") if row else None
+        if path and os.path.exists(path):
+            with open(path, "rb") as fh:
+                return fh.read()
+        return None
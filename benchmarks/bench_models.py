@@ -0,0 +1,163 @@
+"""Compare segmentation models on sample images: latency and mask agreement.
+
+Every model segments the same images with the same ONNX Runtime settings.
+Latency is the median mask inference time after one warm-up run. Agreement
+is the IoU of each binarized mask with the reference model's mask (u2net
+unless --reference says otherwise), so 1.0 means the same cutout.
+
+    python benchmarks/bench_models.py --images samples/ --models u2netp silueta u2net
+    python benchmarks/bench_models.py --intra-op-threads 2 --graph-optimization basic
+    python benchmarks/bench_models.py --quantize     # build models/u2net_int8.onnx first
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageOps
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+# Model paths in SEGMENTATION_MODELS are relative to the repo root
+os.chdir(ROOT)
+
+import rembg  # noqa: E402
+
+from bench_pipeline import git_commit, synthetic_saree  # noqa: E402
+from segmentation_models import (  # noqa: E402
+    DEFAULT_MODEL,
+    GRAPH_OPTIMIZATION_LEVELS,
+    SEGMENTATION_MODELS,
+    create_session,
+    get_model,
+    model_file,
+    quantize_model,
+)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def load_samples(images_dir, max_side, count):
+    """[(name, RGB image)] from a directory, or synthetic photos without one"""
+    samples = []
+    if images_dir:
+        for path in sorted(Path(images_dir).iterdir()):
+            if path.suffix.lower() in IMAGE_EXTENSIONS:
+                img = ImageOps.exif_transpose(Image.open(path)).convert("RGB")
+                samples.append((path.name, img))
+            if len(samples) == count:
+                break
+    else:
+        for seed in range(count):
+            samples.append((f"synthetic-{seed}", Image.open(io.BytesIO(synthetic_saree(2, seed))).convert("RGB")))
+    # Segmentation runs at the model's input size anyway; keep decode/resize cost out of it
+    for _, img in samples:
+        img.thumbnail((max_side, max_side), Image.Resampling.BILINEAR)
+    return samples
+
+
+def mask_iou(a, b, threshold=128):
+    """Intersection over union of two L masks binarized at threshold"""
+    if b.size != a.size:
+        b = b.resize(a.size, Image.Resampling.BILINEAR)
+    a = np.asarray(a) >= threshold
+    b = np.asarray(b) >= threshold
+    union = np.logical_or(a, b).sum()
+    return float(np.logical_and(a, b).sum() / union) if union else 1.0
+
+
+def bench_model(name, samples, repeats, session_kwargs):
+    t0 = time.perf_counter()
+    session = create_session(name, **session_kwargs)
+    create_s = time.perf_counter() - t0
+
+    masks, latencies = {}, {}
+    for sample_name, img in samples:
+        # First run pays for graph allocation
+        rembg.remove(img, session=session, only_mask=True)
+        runs = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            mask = rembg.remove(img, session=session, only_mask=True)
+            runs.append(time.perf_counter() - t0)
+        masks[sample_name] = mask.convert("L")
+        latencies[sample_name] = statistics.median(runs)
+    print(f"  {name:<20} median {statistics.median(latencies.values()):.3f}s", file=sys.stderr)
+    return {"session_create_s": create_s, "latency_s": latencies}, masks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", default=None, help="directory of sample photos (default: synthetic)")
+    parser.add_argument("--count", type=int, default=5, help="number of sample images")
+    parser.add_argument("--max-side", type=int, default=2048, help="downscale samples to this long side")
+    parser.add_argument("--models", nargs="+", default=list(SEGMENTATION_MODELS))
+    parser.add_argument("--reference", default=DEFAULT_MODEL, help="model other masks are scored against")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--intra-op-threads", type=int, default=None)
+    parser.add_argument("--inter-op-threads", type=int, default=None)
+    parser.add_argument("--graph-optimization", choices=GRAPH_OPTIMIZATION_LEVELS, default="all")
+    parser.add_argument("--quantize", action="store_true",
+                        help="build the u2net-int8 model file from the downloaded u2net first")
+    parser.add_argument("--output", default=None,
+                        help="JSON results path (default bench_results/models-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    if args.quantize:
+        quantize_model(model_file("u2net"), get_model("u2net-int8")["model_path"])
+
+    session_kwargs = {
+        "intra_op_threads": args.intra_op_threads,
+        "inter_op_threads": args.inter_op_threads,
+        "graph_optimization": args.graph_optimization,
+    }
+    samples = load_samples(args.images, args.max_side, args.count)
+    models = list(dict.fromkeys([args.reference] + args.models))
+
+    results, masks = {}, {}
+    for name in models:
+        try:
+            results[name], masks[name] = bench_model(name, samples, args.repeats, session_kwargs)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"  {name:<20} skipped: {e}", file=sys.stderr)
+            results[name] = {"skipped": str(e)}
+
+    if args.reference in masks:
+        for name, model_masks in masks.items():
+            ious = {s: mask_iou(masks[args.reference][s], m) for s, m in model_masks.items()}
+            results[name]["iou_vs_reference"] = ious
+            results[name]["mean_iou"] = statistics.fmean(ious.values())
+            results[name]["median_latency_s"] = statistics.median(results[name]["latency_s"].values())
+
+    print(f"\n{'model':<20} {'median s':>9} {'mean IoU':>9}", file=sys.stderr)
+    for name, r in results.items():
+        if "median_latency_s" in r:
+            print(f"{name:<20} {r['median_latency_s']:>9.3f} {r['mean_iou']:>9.4f}", file=sys.stderr)
+
+    commit = git_commit()
+    output = Path(args.output or ROOT / "bench_results" / f"models-{commit or 'worktree'}.json")
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "reference": args.reference,
+        "samples": [name for name, _ in samples],
+        "session_options": session_kwargs,
+        "repeats": args.repeats,
+        "results": results,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
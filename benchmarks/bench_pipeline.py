@@ -0,0 +1,240 @@
+"""Stage-level benchmarks for the PlateMaker pipeline.
+
+Generates synthetic saree-like photos at several resolutions, times every
+PlateMaker stage separately plus an end-to-end run into a LocalUploader,
+and writes machine-readable JSON so runs can be compared across commits.
+
+    python benchmarks/bench_pipeline.py --resolutions 4 12 --repeats 3
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+# PlateMaker resolves its font and logo relative to the repo root
+os.chdir(ROOT)
+
+from local_uploader import LocalUploader  # noqa: E402
+from output_profiles import OUTPUT_PROFILES, encode_image  # noqa: E402
+from platemaker_module import PlateMaker  # noqa: E402
+
+DEFAULT_RESOLUTIONS = (4, 12, 24, 48)
+
+
+def synthetic_saree(megapixels, seed=0):
+    """JPEG bytes of a draped, patterned cloth on a grey studio backdrop"""
+    w = int((megapixels * 1e6 * 3 / 2) ** 0.5)
+    h = int(w * 2 / 3)
+    rng = np.random.default_rng(seed)
+
+    # Backdrop: soft vertical gradient with sensor noise
+    y = np.linspace(0, 1, h, dtype=np.float32)[:, None]
+    backdrop = (200 + 30 * y) * np.ones((1, w), np.float32)
+    img = np.repeat(backdrop[..., None], 3, axis=2)
+
+    # Cloth: woven stripes and a paisley-like sinusoidal motif
+    x0, x1 = int(w * 0.2), int(w * 0.8)
+    y0, y1 = int(h * 0.1), int(h * 0.9)
+    yy, xx = np.mgrid[y0:y1, x0:x1].astype(np.float32)
+    motif = np.sin(xx / 23.0) * np.cos(yy / 31.0) + 0.5 * np.sin((xx + yy) / 57.0)
+    base = np.array([150, 20, 60], np.float32)
+    accent = np.array([230, 180, 60], np.float32)
+    t = ((motif + 1.5) / 3.0)[..., None]
+    cloth = base * (1 - t) + accent * t
+    # Zari border along the bottom edge
+    border = yy > (y1 - (y1 - y0) * 0.12)
+    cloth[border] = accent * 0.9 + 20 * np.sin(xx[border] / 5.0)[..., None]
+    img[y0:y1, x0:x1] = cloth
+    img += rng.normal(0, 3, img.shape).astype(np.float32)
+
+    pil = Image.fromarray(np.clip(img, 0, 255).astype(np.uint8), "RGB")
+    buf = io.BytesIO()
+    pil.save(buf, format="JPEG", quality=92)
+    return buf.getvalue()
+
+
+def synthetic_cutout(size):
+    """RGBA foreground with transparent margins, like a raw segmentation result"""
+    w, h = size
+    img = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+    ImageDraw.Draw(img).ellipse(
+        (w * 0.15, h * 0.1, w * 0.85, h * 0.9), fill=(150, 20, 60, 255)
+    )
+    return img
+
+
+def time_stage(fn, repeats):
+    """Run fn repeats times; return (last result, list of seconds)"""
+    runs = []
+    out = None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        out = fn()
+        runs.append(time.perf_counter() - t0)
+    return out, runs
+
+
+def summarize(runs):
+    return {
+        "runs_s": runs,
+        "min_s": min(runs),
+        "median_s": statistics.median(runs),
+        "mean_s": statistics.fmean(runs),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def bench_resolution(pm, uploader, megapixels, repeats, profiles):
+    img_bytes = synthetic_saree(megapixels)
+    src_size = Image.open(io.BytesIO(img_bytes)).size
+    catalog, design = "Lavanya", "4290"
+    results = {}
+
+    def record(stage, runs, **extra):
+        results[stage] = dict(summarize(runs), **extra)
+        print(f"  {stage:<30} median {results[stage]['median_s']:.3f}s", file=sys.stderr)
+
+    fg, runs = time_stage(lambda: pm.remove_bg_from_bytes(img_bytes), repeats)
+    record("remove_bg_from_bytes", runs, output_size=list(fg.size))
+
+    cutout = synthetic_cutout(src_size)
+    trimmed, runs = time_stage(lambda: pm.trim_transparent(cutout), repeats)
+    record("trim_transparent", runs, input_size=list(cutout.size), output_size=list(trimmed.size))
+
+    small, runs = time_stage(lambda: pm.downsize(fg, pm.FRAME_W, pm.FRAME_H), repeats)
+    record("downsize", runs, output_size=list(small.size))
+
+    # Production places the logo with logo_placement and blends it inside
+    # composite_foreground
+    pm.assets._logos.clear()
+    (logo, logo_pos), runs = time_stage(lambda: pm.logo_placement((small.width, small.height)), 1)
+    record("logo_placement_cold", runs, logo_size=list(logo.size))
+    _, runs = time_stage(lambda: pm.logo_placement((small.width, small.height)), repeats)
+    record("logo_placement_warm", runs)
+
+    banner_text = pm.make_banner_text(catalog, design)
+    pm._fit_cache.clear()
+    pm._width_cache.clear()
+    pm._fit_hints.clear()
+    font, runs = time_stage(lambda: pm.best_font(banner_text, pm.FRAME_W), 1)
+    record("best_font_cold", runs, font_size=font.size)
+    _, runs = time_stage(
+        lambda: pm.best_font(pm.make_banner_text(catalog, "4291"), pm.FRAME_W), repeats
+    )
+    record("best_font_warm", runs)
+
+    def compose():
+        from compositing import composite_foreground
+        layout = pm.banner_layout(catalog, design)
+        cv = pm.plate_canvas(layout)
+        logo, logo_pos = pm.logo_placement((small.width, small.height))
+        sx = pm.SIDE_PAD + (pm.FRAME_W - small.width) // 2
+        sy = pm.TOP_PAD + layout["banner_h"] + (pm.FRAME_H - small.height) // 2
+        return composite_foreground(cv, small, (sx, sy), logo, logo_pos)
+
+    plate, runs = time_stage(compose, repeats)
+    record("composite", runs, output_size=list(plate.size))
+
+    # The logo's share of composite_foreground: the same blend with and without it
+    from compositing import composite_foreground
+    layout = pm.banner_layout(catalog, design)
+    canvas = pm.make_canvas(layout["banner_h"])
+    pos = (pm.SIDE_PAD, pm.TOP_PAD + layout["banner_h"])
+    _, plain = time_stage(lambda: composite_foreground(canvas, small, pos), repeats)
+    record("composite_foreground_no_logo", plain)
+    _, with_logo = time_stage(lambda: composite_foreground(canvas, small, pos, logo, logo_pos), repeats)
+    record("composite_foreground_logo", with_logo,
+           logo_blend_s=statistics.median(with_logo) - statistics.median(plain))
+
+    for profile in profiles:
+        (data, stats), runs = time_stage(lambda: encode_image(plate, profile), repeats)
+        record(f"encode_{profile}", runs, bytes=stats["bytes"])
+
+    # A new name per repeat: re-uploading identical bytes under the same name
+    # would take the unchanged-file skip instead of writing
+    names = (f"{catalog} - {design}-{megapixels:g}mp-{n}.jpg" for n in itertools.count())
+
+    data, _ = encode_image(plate)
+    _, runs = time_stage(
+        lambda: uploader.upload_image(io.BytesIO(data), next(names), catalog),
+        repeats,
+    )
+    record("upload_local", runs, bytes=len(data))
+
+    def end_to_end():
+        out = pm.process_image(img_bytes, catalog, design)
+        encoded, _ = encode_image(out)
+        return uploader.upload_image(io.BytesIO(encoded), next(names), catalog)
+
+    _, runs = time_stage(end_to_end, repeats)
+    record("end_to_end", runs)
+
+    return {
+        "megapixels": megapixels,
+        "input_size": list(src_size),
+        "input_bytes": len(img_bytes),
+        "stages": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resolutions", type=float, nargs="+", default=DEFAULT_RESOLUTIONS,
+                        help="input sizes in megapixels")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--profiles", nargs="+", default=list(OUTPUT_PROFILES),
+                        help="output profiles to time encoding for")
+    parser.add_argument("--output", default=None,
+                        help="JSON results path (default bench_results/<commit>.json)")
+    args = parser.parse_args(argv)
+
+    commit = git_commit()
+    output = Path(args.output or ROOT / "bench_results" / f"{commit or 'worktree'}.json")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # No cache, so every run really segments
+        pm = PlateMaker(cache_dir=None)
+        uploader = LocalUploader(Path(tmp) / "drive")
+        runs = []
+        for mp in args.resolutions:
+            print(f"{mp:g} MP", file=sys.stderr)
+            runs.append(bench_resolution(pm, uploader, mp, args.repeats, args.profiles))
+
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeats": args.repeats,
+        "startup": pm.startup_timings,
+        "results": runs,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from PIL import Image
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundCache:
+    """Content-addressed on-disk cache for background-removed foregrounds.
+
+    Entries are keyed by a hash of the input bytes plus a config version
+    (model name etc.) and stored as PNG files. Several processes (the app
+    and its batch workers) share one directory, so the files on disk are
+    the source of truth: a key missing from this process's index is still
+    looked up on disk, and eviction works from the directory listing. Total
+    size is bounded; the least recently used entries (oldest mtime, which
+    hits refresh) are evicted first.
+    """
+
+    def __init__(self, cache_dir=".bg_cache", max_bytes=2 * 1024**3, version="v1"):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> size in bytes, ordered from least to most recently used
+        self._index = OrderedDict()
+        self._total_bytes = 0
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._load_index()
+            logger.info(f"🗄️ Background cache: {len(self._index)} entries, {self._total_bytes} bytes")
+        except Exception as e:
+            logger.warning(f"Background cache disabled, cannot use {self.cache_dir}: {str(e)}")
+            self.cache_dir = None
+
+    def _scan(self):
+        """[(mtime, key, size)] for every entry on disk, least recently used first"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".png"):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    # Evicted by another process mid-scan
+                    continue
+                entries.append((st.st_mtime, entry.name[:-4], st.st_size))
+        return sorted(entries)
+
+    def _load_index(self, entries=None):
+        """Rebuild the LRU order from file modification times"""
+        entries = self._scan() if entries is None else entries
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total_bytes = sum(size for _, _, size in entries)
+
+    def key_for(self, img_bytes):
+        h = hashlib.sha256()
+        h.update(self.version.encode("utf-8"))
+        h.update(b"\0")
+        h.update(img_bytes)
+        return h.hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.png"
+
+    def get(self, key):
+        """Return the cached RGBA image for key, or None"""
+        if self.cache_dir is None:
+            return None
+        path = self._path(key)
+        try:
+            img = Image.open(path)
+            img.load()
+            os.utime(path)
+        except FileNotFoundError:
+            # Never written, or evicted by another process
+            with self._lock:
+                self._total_bytes -= self._index.pop(key, 0)
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Dropping unreadable cache entry {key}: {str(e)}")
+            self._discard(key)
+            self.misses += 1
+            return None
+
+        with self._lock:
+            if key not in self._index:
+                # Written by another process; adopt it
+                size = path.stat().st_size
+                self._index[key] = size
+                self._total_bytes += size
+            self._index.move_to_end(key)
+        self.hits += 1
+        return img.convert("RGBA") if img.mode != "RGBA" else img
+
+    def put(self, key, img):
+        """Store an RGBA image under key and evict down to max_bytes"""
+        if self.cache_dir is None:
+            return
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            # Low compression keeps writes fast; these are large images
+            img.save(tmp, format="PNG", compress_level=1)
+            os.replace(tmp, path)
+            size = path.stat().st_size
+        except Exception as e:
+            logger.warning(f"Could not write cache entry {key}: {str(e)}")
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            # Other processes write here too, so budget against the whole directory;
+            # listing it costs far less than the PNG write above
+            entries = self._scan()
+            total = sum(size for _, _, size in entries)
+            evict = []
+            for _, old_key, old_size in entries:
+                if total <= self.max_bytes:
+                    break
+                if old_key != key:
+                    evict.append(old_key)
+                    total -= old_size
+            evicted = set(evict)
+            self._load_index([e for e in entries if e[1] not in evicted])
+        for old_key in evict:
+            try:
+                self._path(old_key).unlink()
+            except OSError:
+                pass
+        if evict:
+            logger.info(f"🧹 Evicted {len(evict)} background cache entries")
+
+    def _discard(self, key):
+        with self._lock:
+            self._total_bytes -= self._index.pop(key, 0)
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._index),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
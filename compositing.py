@@ -0,0 +1,96 @@
+from PIL import Image
+
+# numpy is imported inside the kernels so importing this module (and with it
+# platemaker_module) stays cheap for the app's first render
+
+# Integer kernels mirroring Pillow's Paste.c so results match the old
+# paste()-based chain byte for byte:
+#   DIV255(v)          = ((v + 128) >> 8 + (v + 128)) >> 8
+#   BLEND(m, out, in)  = DIV255(out * (255 - m) + in * m)
+# All intermediates fit in uint16 (max 255 * 255 + 255).
+
+
+def _div255(v):
+    """In-place DIV255 on a uint16 array"""
+    v += 128
+    v += v >> 8
+    v >>= 8
+    return v
+
+
+def _blend(mask, out, inp):
+    """BLEND(mask, out, inp) as a new uint16 array; mask is uint16"""
+    import numpy as np
+    res = out.astype(np.uint16)
+    res *= 255 - mask
+    res += inp * mask
+    return _div255(res)
+
+
+def alpha_bbox(img, threshold=0):
+    """Bounding box (x0, y0, x1, y1) of pixels with alpha above threshold, or None"""
+    import numpy as np
+    alpha = np.asarray(img.getchannel("A"))
+    mask = alpha > threshold
+    rows = np.flatnonzero(mask.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(mask[rows[0]:rows[-1] + 1].any(axis=0))
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def _clip_box(x, y, w, h, bound_w, bound_h):
+    """Intersect a w x h box at (x, y) with (0, 0, bound_w, bound_h)"""
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, bound_w), min(y + h, bound_h)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return x0, y0, x1, y1
+
+
+def composite_foreground(canvas, fg, pos, logo=None, logo_pos=(0, 0)):
+    """Blend an RGBA foreground (and optional logo over it) onto an RGB canvas in one pass.
+
+    Equivalent to pasting fg onto a transparent RGBA layer, pasting the logo
+    onto that layer at logo_pos (relative to fg), then pasting the layer
+    onto canvas at pos with itself as mask. Only fg-sized buffers are
+    allocated; canvas is updated in place.
+    """
+    import numpy as np
+
+    box = _clip_box(pos[0], pos[1], fg.width, fg.height, canvas.width, canvas.height)
+    if box is None:
+        return canvas
+    fx0, fy0 = box[0] - pos[0], box[1] - pos[1]
+    fx1, fy1 = box[2] - pos[0], box[3] - pos[1]
+
+    fg_arr = np.asarray(fg)[fy0:fy1, fx0:fx1]
+    region = np.array(canvas.crop(box))
+    a = fg_arr[..., 3].astype(np.uint16)
+
+    # Layer alpha: paste onto transparent squares alpha (DIV255(a * a))
+    layer_a = _div255(a * a)
+
+    logo_box = None
+    if logo is not None:
+        logo_box = _clip_box(logo_pos[0] - fx0, logo_pos[1] - fy0,
+                             logo.width, logo.height, fx1 - fx0, fy1 - fy0)
+    if logo_box is not None:
+        lx0, ly0, lx1, ly1 = logo_box
+        ox, oy = lx0 - (logo_pos[0] - fx0), ly0 - (logo_pos[1] - fy0)
+        logo_arr = np.asarray(logo)[oy:oy + ly1 - ly0, ox:ox + lx1 - lx0]
+        la = logo_arr[..., 3].astype(np.uint16)
+        sub = layer_a[ly0:ly1, lx0:lx1]
+        sub[...] = _blend(la, sub, la)
+
+    for ch in range(3):
+        # Layer colour: premultiplied by alpha, then logo blended over it
+        layer_c = _div255(fg_arr[..., ch] * a)
+        if logo_box is not None:
+            sub = layer_c[ly0:ly1, lx0:lx1]
+            sub[...] = _blend(la, sub, logo_arr[..., ch].astype(np.uint16))
+        region[..., ch] = _blend(layer_a, region[..., ch], layer_c)
+        del layer_c
+
+    canvas.paste(Image.fromarray(region), box[:2])
+    return canvas
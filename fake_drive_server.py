@@ -0,0 +1,314 @@
+"""Local stand-in for the Drive v3 endpoints DriveUploader uses, with fault injection.
+
+Implements enough of Drive for the uploader to run unchanged against it:
+file listing with the q filters the uploader sends, folder creation, batch
+requests and resumable uploads (session open, chunked PUTs, "bytes */N"
+status queries). Chunk PUTs can be made to fail at random so retry and
+resume logic can be exercised without a real network:
+
+    python fake_drive_server.py --port 8765 --error-rate 0.2 --drop-rate 0.1
+
+    uploader = DriveUploader(credentials=Credentials("fake"),
+                             api_endpoint="http://127.0.0.1:8765/")
+
+Nothing is persisted; GET /_fake/stats returns what the server saw.
+"""
+import argparse
+import email.parser
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUOTED = r"'((?:[^'\\]|\\.)*)'"
+
+
+def _unquote(value):
+    return re.sub(r"\\(.)", r"\1", value)
+
+
+class Faults:
+    """Per-chunk fault probabilities for resumable upload PUTs.
+
+    error: answer 503 without storing anything.
+    drop: store the first half of the chunk, then close the connection
+        without a response (a network drop mid-request).
+    partial: store the first half and answer 308 with the shorter range.
+    """
+
+    def __init__(self, error_rate=0.0, drop_rate=0.0, partial_rate=0.0, seed=None):
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.partial_rate = partial_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def pick(self):
+        """None or the name of the fault to inject into this chunk"""
+        with self._lock:
+            r = self._rng.random()
+        for name, rate in (("error", self.error_rate), ("drop", self.drop_rate),
+                           ("partial", self.partial_rate)):
+            if r < rate:
+                return name
+            r -= rate
+        return None
+
+
+class FakeDrive:
+    """In-memory files and upload sessions"""
+
+    def __init__(self, faults=None):
+        self.faults = faults or Faults()
+        self.files = {}
+        # IDs of deleted files and folders; creating inside one is a 404 like on Drive
+        self.deleted = set()
+        self.sessions = {}
+        self.stats = {"requests": 0, "chunks": 0, "bytes_received": 0, "status_queries": 0,
+                      "uploads_started": 0, "uploads_completed": 0,
+                      "faults": {"error": 0, "drop": 0, "partial": 0}}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _new_id(self, prefix):
+        return f"{prefix}{next(self._ids):06d}"
+
+    def _add_file(self, meta, base_url, content=None):
+        file_id = self._new_id("file")
+        record = {
+            "kind": "drive#file",
+            "id": file_id,
+            "name": meta.get("name", "Untitled"),
+            "mimeType": meta.get("mimeType", "application/octet-stream"),
+            "parents": meta.get("parents", []),
+            "trashed": False,
+            "webViewLink": f"{base_url}/file/{file_id}/view",
+        }
+        if content is not None:
+            record["size"] = str(len(content))
+            record["md5Checksum"] = hashlib.md5(content).hexdigest()
+        self.files[file_id] = record
+        return record
+
+    def delete(self, file_id):
+        """Remove a file or folder outright (not to the trash)"""
+        with self._lock:
+            self.files.pop(file_id, None)
+            self.deleted.add(file_id)
+
+    def _missing_parent(self, meta):
+        """404 response for metadata whose parent was deleted, else None"""
+        gone = [p for p in meta.get("parents", []) if p in self.deleted]
+        if not gone:
+            return None
+        message = f"File not found: {gone[0]}."
+        return 404, {}, json.dumps({"error": {
+            "code": 404, "message": message,
+            "errors": [{"domain": "global", "reason": "notFound", "message": message}],
+        }}).encode()
+
+    def list_files(self, q):
+        """Files matching the subset of Drive's q syntax the uploader sends"""
+        filters = []
+        for field, value in re.findall(r"(name|mimeType)\s*=\s*" + QUOTED, q or ""):
+            filters.append(lambda f, k=field, v=_unquote(value): f[k] == v)
+        for value in re.findall(r"parents\s+in\s+" + QUOTED, q or "") + \
+                re.findall(QUOTED + r"\s+in\s+parents", q or ""):
+            filters.append(lambda f, v=_unquote(value): v in f["parents"])
+        for value in re.findall(r"trashed\s*=\s*(true|false)", q or ""):
+            filters.append(lambda f, v=value == "true": f["trashed"] == v)
+        with self._lock:
+            return [dict(f) for f in self.files.values() if all(flt(f) for flt in filters)]
+
+    def handle(self, method, path, query, headers, body, base_url):
+        """(status, headers, body bytes) for one API call; None means drop the connection"""
+        with self._lock:
+            self.stats["requests"] += 1
+        params = urllib.parse.parse_qs(query)
+
+        if method == "GET" and path == "/_fake/stats":
+            with self._lock:
+                return 200, {}, json.dumps(self.stats).encode()
+        if method == "GET" and path == "/drive/v3/files":
+            return 200, {}, json.dumps({"files": self.list_files(params.get("q", [""])[0])}).encode()
+        if method == "POST" and path == "/drive/v3/files":
+            meta = json.loads(body or b"{}")
+            with self._lock:
+                missing = self._missing_parent(meta)
+                if missing:
+                    return missing
+                record = self._add_file(meta, base_url)
+            return 200, {}, json.dumps(record).encode()
+        if method == "POST" and path == "/upload/drive/v3/files" \
+                and params.get("uploadType") == ["resumable"]:
+            meta = json.loads(body or b"{}")
+            with self._lock:
+                missing = self._missing_parent(meta)
+                if missing:
+                    return missing
+                session_id = self._new_id("upload")
+                self.sessions[session_id] = {
+                    "meta": meta,
+                    "data": bytearray(),
+                    "total": int(headers.get("X-Upload-Content-Length", 0)) or None,
+                    "file": None,
+                }
+                self.stats["uploads_started"] += 1
+            location = f"{base_url}/upload/drive/v3/files?uploadType=resumable&upload_id={session_id}"
+            return 200, {"Location": location}, b""
+        if method == "PUT" and path == "/upload/drive/v3/files" and "upload_id" in params:
+            return self._put_chunk(params["upload_id"][0], headers, body, base_url)
+        return 404, {}, json.dumps({"error": {"code": 404, "message": f"No route: {method} {path}"}}).encode()
+
+    def _put_chunk(self, session_id, headers, body, base_url):
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return 404, {}, json.dumps({"error": {"code": 404, "message": "Upload session not found"}}).encode()
+            if session["file"] is not None:
+                return 200, {}, json.dumps(session["file"]).encode()
+
+            content_range = headers.get("Content-Range", "")
+            match = re.match(r"bytes (\*|(\d+)-(\d+))/(\*|\d+)", content_range)
+            if match and match.group(4) != "*":
+                session["total"] = int(match.group(4))
+            if match is None or match.group(1) == "*":
+                self.stats["status_queries"] += 1
+                return self._progress(session, base_url)
+
+            start = int(match.group(2))
+            self.stats["chunks"] += 1
+            self.stats["bytes_received"] += len(body)
+            fault = self.faults.pick()
+            if fault:
+                self.stats["faults"][fault] += 1
+            if fault == "error":
+                return 503, {}, json.dumps({"error": {"code": 503, "message": "Injected backend error"}}).encode()
+            if fault in ("drop", "partial"):
+                body = body[:len(body) // 2]
+
+            offset = len(session["data"])
+            # Ranges past what we have are refused; overlaps are trimmed
+            if start <= offset:
+                session["data"] += body[offset - start:]
+            if fault == "drop":
+                return None
+            return self._progress(session, base_url)
+
+    def _progress(self, session, base_url):
+        received = len(session["data"])
+        if session["total"] is not None and received >= session["total"]:
+            session["file"] = self._add_file(session["meta"], base_url, bytes(session["data"]))
+            self.stats["uploads_completed"] += 1
+            return 200, {}, json.dumps(session["file"]).encode()
+        headers = {"Range": f"bytes=0-{received - 1}"} if received else {}
+        return 308, headers, b""
+
+    def handle_batch(self, content_type, body, base_url):
+        """Answer a multipart/mixed batch by running each embedded request"""
+        message = email.parser.BytesParser().parsebytes(
+            b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body
+        )
+        boundary = "batch_fake_drive"
+        out = []
+        for part in message.get_payload():
+            raw = part.get_payload(decode=True)
+            head, _, sub_body = raw.partition(b"\r\n\r\n")
+            if not _:
+                head, _, sub_body = raw.partition(b"\n\n")
+            lines = head.decode().splitlines()
+            method, target, _version = lines[0].split(" ", 2)
+            sub_headers = dict(line.split(": ", 1) for line in lines[1:] if ": " in line)
+            url = urllib.parse.urlsplit(target)
+            result = self.handle(method, url.path, url.query, sub_headers, sub_body, base_url)
+            status, headers, content = result or (503, {}, b"")
+            content_id = part.get("Content-ID", "").strip("<>")
+            out.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(content)}\r\n\r\n".encode() + content + b"\r\n"
+            )
+        out.append(f"--{boundary}--\r\n".encode())
+        return 200, {"Content-Type": f"multipart/mixed; boundary={boundary}"}, b"".join(out)
+
+
+def make_handler(drive):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            logger.debug(fmt % args)
+
+        def _dispatch(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            base_url = f"http://{self.headers.get('Host', '%s:%d' % self.server.server_address)}"
+            url = urllib.parse.urlsplit(self.path)
+            if self.command == "POST" and url.path == "/batch/drive/v3":
+                with drive._lock:
+                    drive.stats["requests"] += 1
+                result = drive.handle_batch(self.headers.get("Content-Type", ""), body, base_url)
+            else:
+                result = drive.handle(self.command, url.path, url.query, self.headers, body, base_url)
+            if result is None:
+                # Injected drop: hang up without answering
+                self.close_connection = True
+                return
+            status, headers, content = result
+            self.send_response(status)
+            headers.setdefault("Content-Type", "application/json")
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        do_GET = do_POST = do_PUT = _dispatch
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=0, faults=None):
+    """Start a fake Drive on a background thread; returns (server, drive).
+
+    The bound address is server.server_address; call server.shutdown() to stop.
+    """
+    drive = FakeDrive(faults)
+    server = ThreadingHTTPServer((host, port), make_handler(drive))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-drive", daemon=True).start()
+    logger.info(f"🧪 Fake Drive listening on http://{host}:{server.server_address[1]}/")
+    return server, drive
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fault-injecting local stand-in for Google Drive.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="chance a chunk gets a 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+                        help="chance the connection drops halfway through a chunk")
+    parser.add_argument("--partial-rate", type=float, default=0.0,
+                        help="chance only half a chunk is accepted")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    server, _ = serve(args.host, args.port,
+                      Faults(args.error_rate, args.drop_rate, args.partial_rate, args.seed))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
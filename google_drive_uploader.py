@@ -1,20 +1,211 @@
 from __future__ import print_function
 import os.path
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseUpload
-from google_auth_oauthlib.flow import InstalledAppFlow
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from google.auth.transport.requests import Request
+import functools
+import hashlib
+import http.client
+import json
 import pickle
 import io
+import random
+import time
+import datetime
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
 SCOPES = ['https://www.googleapis.com/auth/drive.file']
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+# Drive accepts at most 100 calls per batch HTTP request
+BATCH_LIMIT = 100
+# Resumable upload chunks must be a multiple of 256 KiB (except the last)
+CHUNK_UNIT = 256 * 1024
+DEFAULT_CHUNK_SIZE = 16 * CHUNK_UNIT
+# Responses worth retrying: timeouts, rate limits and server errors
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+# File fields needed to recognise an unchanged plate already on Drive
+FILE_FIELDS = 'id, name, md5Checksum, webViewLink'
+
+
+def timestamped_name(filename, taken=()):
+    """filename with a _HHMMSS suffix, plus a counter if that is also in taken"""
+    timestamp = datetime.datetime.now().strftime("%H%M%S")
+    stem, dot, ext = filename.rpartition('.')
+    if not dot:
+        stem, ext = filename, ''
+    candidate = f"{stem}_{timestamp}{dot}{ext}"
+    n = 2
+    while candidate in taken:
+        candidate = f"{stem}_{timestamp}_{n}{dot}{ext}"
+        n += 1
+    return candidate
+
+
+def content_md5(data):
+    """Hex MD5 of encoded plate bytes, comparable with Drive's md5Checksum"""
+    return hashlib.md5(data, usedforsecurity=False).hexdigest()
+
+
+def busy_seconds(spans):
+    """Length of the union of (start, end) intervals, i.e. time with any of them running"""
+    total = 0.0
+    busy_until = None
+    for start, end in sorted(spans):
+        if busy_until is None or start > busy_until:
+            total += end - start
+            busy_until = end
+        elif end > busy_until:
+            total += end - busy_until
+            busy_until = end
+    return total
+
+
+@functools.lru_cache(maxsize=1)
+def drive_discovery_document():
+    """Drive v3 discovery document bundled with google-api-python-client.
+
+    Kept as the raw JSON string: build_from_document mutates a parsed dict.
+    """
+    doc = get_static_doc("drive", "v3")
+    if doc is None:
+        raise RuntimeError("google-api-python-client has no bundled drive v3 discovery document")
+    return doc
+
+
+def build_drive_service(credentials=None, http=None, api_endpoint=None):
+    """Drive client built from the bundled discovery document, with no network fetch.
+
+    api_endpoint (e.g. "http://127.0.0.1:8765/") points every call at another
+    host, such as fake_drive_server.
+    """
+    doc = drive_discovery_document()
+    if api_endpoint:
+        # Upload and batch URLs are built from rootUrl, not the client's api_endpoint
+        doc = json.loads(doc)
+        doc['rootUrl'] = api_endpoint.rstrip('/') + '/'
+        doc.pop('mtlsRootUrl', None)
+    return build_from_document(doc, credentials=credentials, http=http)
+
+
+def is_transient(error):
+    """True for upload errors that are worth retrying after a pause"""
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        if status in RETRYABLE_STATUS:
+            return True
+        if status == 403:
+            details = getattr(error, 'error_details', None) or []
+            return any(isinstance(d, dict) and d.get('reason') in RATE_LIMIT_REASONS for d in details)
+        return False
+    import httplib2
+    # Connection resets, timeouts, DNS and TLS failures are all OSErrors
+    return isinstance(error, (OSError, http.client.HTTPException, httplib2.HttpLib2Error))
+
+
+def is_missing_folder(error, folder_id):
+    """True for Drive's 404 notFound naming folder_id, i.e. a deleted or moved folder"""
+    if not (folder_id and isinstance(error, HttpError) and error.resp.status == 404):
+        return False
+    content = error.content.decode('utf-8', 'replace') if isinstance(error.content, bytes) else str(error.content)
+    return folder_id in content
+
+
+class _ChunkUpload(MediaIoBaseUpload):
+    """Resumable media whose chunks are sent as bytes, not stream slices.
+
+    httplib2 transparently re-sends a request when the connection drops
+    before the response; a stream slice is already consumed by then and
+    the retry would send an empty body.
+    """
+
+    def has_stream(self):
+        return False
+
+
+class ResumableSessionStore:
+    """Resumable upload session URIs kept on disk, keyed by destination and content.
+
+    Lets a retry, or a later run after a crash, continue an interrupted upload
+    from the last byte Drive confirmed. Drive expires sessions after about a
+    week, so older entries are dropped.
+    """
+
+    def __init__(self, path=".upload_sessions.json", max_age_s=6 * 24 * 3600):
+        self.path = path
+        self.max_age_s = max_age_s
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(data, folder_id, filename):
+        digest = hashlib.sha256(data).hexdigest()
+        return f"{folder_id}/{filename}/{digest}"
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        cutoff = time.time() - self.max_age_s
+        return {k: v for k, v in entries.items() if v.get('created', 0) > cutoff}
+
+    def _save(self, entries):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(entries, f)
+        os.replace(tmp, self.path)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._load().get(key)
+        return entry['uri'] if entry else None
+
+    def put(self, key, uri):
+        with self._lock:
+            entries = self._load()
+            entries[key] = {'uri': uri, 'created': time.time()}
+            self._save(entries)
+
+    def discard(self, key):
+        with self._lock:
+            entries = self._load()
+            if entries.pop(key, None) is not None:
+                self._save(entries)
+
 
 class DriveUploader:
-    def __init__(self, credentials_file="credentials.json"):
+    def __init__(self, credentials_file="credentials.json", folder_cache_ttl=600,
+                 prefetch_in_background=False, chunk_size=DEFAULT_CHUNK_SIZE, max_retries=8,
+                 backoff_base=1.0, backoff_max=32.0, resume_store=".upload_sessions.json",
+                 credentials=None, api_endpoint=None):
         self.credentials_file = credentials_file
+        # Pre-authorized credentials skip token.pickle and the OAuth flow
+        self._preset_creds = credentials
+        self.api_endpoint = api_endpoint
+        self.chunk_size = max(CHUNK_UNIT, chunk_size // CHUNK_UNIT * CHUNK_UNIT)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # None disables persisting session URIs between attempts and runs
+        self.resume_store = ResumableSessionStore(resume_store) if resume_store else None
+        self.retries = 0
+        self._retry_lock = threading.Lock()
+        # (parent_id, folder_name) -> (folder_id, expires_at)
+        self.folder_cache_ttl = folder_cache_ttl
+        self._folder_cache = {}
+        self._folder_lock = threading.Lock()
+        # Upload workers each get their own service/HTTP client here
+        self._local = threading.local()
+        self.creds = None
+        self.last_upload_stats = None
+        self.startup_timings = {"auth_s": 0.0, "build_service_s": 0.0, "prefetch_folders_s": None}
         try:
             self.service = self._authenticate()
             self.main_folder_id = "1doyiFBYxHfdbLmqu2seRZJMbPH2940_z"
@@ -22,17 +213,77 @@ class DriveUploader:
         except Exception as e:
             logger.error(f"Failed to initialize DriveUploader: {str(e)}")
             raise e
+        if prefetch_in_background:
+            # Folder lookups fall back to queries until the cache is warm
+            threading.Thread(
+                target=self._timed_prefetch, args=(True,), name="drive-prefetch", daemon=True
+            ).start()
+        else:
+            self._timed_prefetch()
+
+    def _cache_folder(self, folder_name, parent_id, folder_id):
+        with self._folder_lock:
+            self._folder_cache[(parent_id, folder_name)] = (
+                folder_id, time.monotonic() + self.folder_cache_ttl
+            )
+
+    def _cached_folder(self, folder_name, parent_id):
+        with self._folder_lock:
+            entry = self._folder_cache.get((parent_id, folder_name))
+            if entry and entry[1] > time.monotonic():
+                return entry[0]
+            self._folder_cache.pop((parent_id, folder_name), None)
+            return None
+
+    def invalidate_folder(self, folder_name, parent_id=None):
+        """Forget a cached folder ID so the next call looks it up again"""
+        parent_id = parent_id or self.main_folder_id
+        with self._folder_lock:
+            self._folder_cache.pop((parent_id, folder_name), None)
+
+    def _timed_prefetch(self, own_client=False):
+        t0 = time.perf_counter()
+        if own_client:
+            # A background prefetch may run alongside requests on the shared client
+            self._init_upload_worker()
+        self.prefetch_folders(self.main_folder_id)
+        self.startup_timings["prefetch_folders_s"] = time.perf_counter() - t0
+
+    def prefetch_folders(self, parent_id):
+        """List every subfolder of parent_id once and cache name -> ID"""
+        try:
+            count = 0
+            page_token = None
+            while True:
+                results = self._service().files().list(
+                    q=f"mimeType='{FOLDER_MIME}' and parents in '{parent_id}' and trashed=false",
+                    fields="nextPageToken, files(id, name)",
+                    pageSize=1000,
+                    pageToken=page_token,
+                ).execute()
+                for folder in results.get('files', []):
+                    # Keep the first match, like get_or_create_folder does
+                    if self._cached_folder(folder['name'], parent_id) is None:
+                        self._cache_folder(folder['name'], parent_id, folder['id'])
+                        count += 1
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+            logger.info(f"📁 Prefetched {count} catalog folder(s)")
+        except Exception as e:
+            logger.warning(f"Folder prefetch failed, will look up on demand: {str(e)}")
 
     def _authenticate(self):
         """Handle Google Drive authentication with error handling"""
         try:
-            creds = None
-            if os.path.exists('token.pickle'):
+            t0 = time.perf_counter()
+            creds = self._preset_creds
+            if creds is None and os.path.exists('token.pickle'):
                 with open('token.pickle', 'rb') as token:
                     creds = pickle.load(token)
                     logger.info("Loaded existing credentials from token.pickle")
 
-            if not creds or not creds.valid:
+            if self._preset_creds is None and (not creds or not creds.valid):
                 if creds and creds.expired and creds.refresh_token:
                     logger.info("Refreshing expired credentials")
                     creds.refresh(Request())
@@ -41,6 +292,8 @@ class DriveUploader:
                     if not os.path.exists(self.credentials_file):
                         raise FileNotFoundError(f"Credentials file not found: {self.credentials_file}")
                     
+                    # Only needed the first time, so not imported at module load
+                    from google_auth_oauthlib.flow import InstalledAppFlow
                     flow = InstalledAppFlow.from_client_secrets_file(
                         self.credentials_file, SCOPES
                     )
@@ -51,75 +304,438 @@ class DriveUploader:
                     pickle.dump(creds, token)
                     logger.info("Saved new credentials to token.pickle")
 
-            service = build('drive', 'v3', credentials=creds)
-            logger.info("Successfully built Drive service")
+            self.creds = creds
+            self.startup_timings["auth_s"] = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            service = build_drive_service(credentials=creds, api_endpoint=self.api_endpoint)
+            self.startup_timings["build_service_s"] = time.perf_counter() - t0
+            logger.info(
+                f"Successfully built Drive service in {self.startup_timings['build_service_s'] * 1000:.0f}ms"
+            )
             return service
             
         except Exception as e:
             logger.error(f"Authentication failed: {str(e)}")
             raise e
 
+    def _service(self):
+        """The calling upload worker's own service, else the shared one"""
+        return getattr(self._local, 'service', None) or self.service
+
+    def _init_upload_worker(self):
+        """Give this thread its own authorized HTTP client; httplib2 is not thread-safe"""
+        import google_auth_httplib2
+        from googleapiclient.http import build_http
+        # build_http sets a timeout and stops httplib2 following 308 (resume incomplete)
+        http = google_auth_httplib2.AuthorizedHttp(self.creds, http=build_http())
+        self._local.service = build_drive_service(http=http, api_endpoint=self.api_endpoint)
+
     def get_or_create_folder(self, folder_name, parent_id):
         """Get existing folder or create new one in specific parent"""
+        folder_id = self._cached_folder(folder_name, parent_id)
+        if folder_id:
+            return folder_id
         try:
-            query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and parents in '{parent_id}'"
-            results = self.service.files().list(q=query).execute()
+            query = (f"name='{folder_name}' and mimeType='{FOLDER_MIME}' "
+                     f"and parents in '{parent_id}' and trashed=false")
+            service = self._service()
+            results = service.files().list(q=query).execute()
             folders = results.get('files', [])
             if folders:
                 logger.info(f"📁 Found existing folder: {folder_name}")
-                return folders[0]['id']
+                folder_id = folders[0]['id']
             else:
                 folder_metadata = {
                     'name': folder_name,
-                    'mimeType': 'application/vnd.google-apps.folder',
+                    'mimeType': FOLDER_MIME,
                     'parents': [parent_id]
                 }
-                folder = self.service.files().create(body=folder_metadata).execute()
+                folder = service.files().create(body=folder_metadata).execute()
                 logger.info(f"📁 Created new folder: {folder_name}")
-                return folder.get('id')
+                folder_id = folder.get('id')
+            self._cache_folder(folder_name, parent_id, folder_id)
+            return folder_id
         except Exception as e:
             logger.error(f"Error in get_or_create_folder: {str(e)}")
+            self.invalidate_folder(folder_name, parent_id)
             raise e
 
-    def upload_image(self, image_bytes, filename, catalog):
-        """Upload with comprehensive error handling"""
+    def _execute_batch(self, requests):
+        """Run (key, request) pairs as Drive batch HTTP requests.
+
+        Returns {key: response} and {key: exception}.
+        """
+        responses, errors = {}, {}
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                errors[request_id] = exception
+            else:
+                responses[request_id] = response
+
+        for start in range(0, len(requests), BATCH_LIMIT):
+            chunk = requests[start:start + BATCH_LIMIT]
+            batch = self._service().new_batch_http_request(callback=callback)
+            for key, request in chunk:
+                batch.add(request, request_id=key)
+            batch.execute()
+        return responses, errors
+
+    def resolve_folders(self, folder_names, parent_id=None):
+        """Folder IDs for many names at once, creating missing folders.
+
+        Uncached lookups go out as one batch request and any creates as
+        another, so the cost is two round-trips regardless of count.
+        """
+        parent_id = parent_id or self.main_folder_id
+        names = list(dict.fromkeys(folder_names))
+        folder_ids = {}
+        missing = []
+        for name in names:
+            folder_id = self._cached_folder(name, parent_id)
+            if folder_id:
+                folder_ids[name] = folder_id
+            else:
+                missing.append(name)
+        if not missing:
+            return folder_ids
+
+        service = self._service()
+        keys = {f"q{i}": name for i, name in enumerate(missing)}
+        lookups = [
+            (key, service.files().list(
+                q=f"name='{name}' and mimeType='{FOLDER_MIME}' and parents in '{parent_id}' and trashed=false"
+            ))
+            for key, name in keys.items()
+        ]
+        responses, errors = self._execute_batch(lookups)
+
+        to_create = []
+        for key, name in keys.items():
+            if key in errors:
+                self.invalidate_folder(name, parent_id)
+                raise errors[key]
+            folders = responses[key].get('files', [])
+            if folders:
+                folder_ids[name] = folders[0]['id']
+                self._cache_folder(name, parent_id, folders[0]['id'])
+            else:
+                to_create.append(name)
+
+        if to_create:
+            keys = {f"c{i}": name for i, name in enumerate(to_create)}
+            creates = [
+                (key, service.files().create(body={
+                    'name': name,
+                    'mimeType': FOLDER_MIME,
+                    'parents': [parent_id]
+                }))
+                for key, name in keys.items()
+            ]
+            responses, errors = self._execute_batch(creates)
+            for key, name in keys.items():
+                if key in errors:
+                    self.invalidate_folder(name, parent_id)
+                    raise errors[key]
+                folder_ids[name] = responses[key].get('id')
+                self._cache_folder(name, parent_id, folder_ids[name])
+                logger.info(f"📁 Created new folder: {name}")
+        return folder_ids
+
+    def list_folder_files(self, folder_ids):
+        """{folder_id: {name: file}} for every file in each folder.
+
+        First pages are fetched in one batch request; only folders with more
+        than a page of files need follow-up calls.
+        """
+        fields = f"nextPageToken, files({FILE_FIELDS})"
+        files_by_folder = {folder_id: {} for folder_id in folder_ids}
+        service = self._service()
+        keys = {f"l{i}": folder_id for i, folder_id in enumerate(files_by_folder)}
+        requests = [
+            (key, service.files().list(
+                q=f"parents in '{folder_id}' and trashed=false", fields=fields, pageSize=1000
+            ))
+            for key, folder_id in keys.items()
+        ]
+        responses, errors = self._execute_batch(requests)
+        for key, folder_id in keys.items():
+            if key in errors:
+                raise errors[key]
+            results = responses[key]
+            while True:
+                for f in results.get('files', []):
+                    files_by_folder[folder_id].setdefault(f['name'], f)
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+                results = service.files().list(
+                    q=f"parents in '{folder_id}' and trashed=false", fields=fields,
+                    pageSize=1000, pageToken=page_token,
+                ).execute()
+        return files_by_folder
+
+    def plan_uploads(self, entries):
+        """Resolve target folders and final names for a batch of uploads.
+
+        entries is a list of (filename, catalog). Returns a list of
+        (folder_id, final_filename, existing) in the same order. Each catalog
+        folder is listed once and name collisions (with Drive or within the
+        batch) are renamed locally the same way upload_image does. existing
+        is the Drive file already using the requested name, or None; passing
+        it to upload_many lets an unchanged plate keep that file instead.
+        """
+        folder_ids = self.resolve_folders([catalog for _, catalog in entries])
+        on_drive = self.list_folder_files(set(folder_ids.values()))
+        taken = {folder_id: set(files) for folder_id, files in on_drive.items()}
+
+        plan = []
+        for filename, catalog in entries:
+            folder_id = folder_ids[catalog]
+            existing = on_drive[folder_id].get(filename)
+            if filename in taken[folder_id]:
+                renamed = timestamped_name(filename, taken[folder_id])
+                logger.info(f"File exists, renamed to: {renamed}")
+                filename = renamed
+            taken[folder_id].add(filename)
+            plan.append((folder_id, filename, existing))
+        logger.info(f"🗂️ Planned {len(plan)} upload(s) into {len(folder_ids)} folder(s)")
+        return plan
+
+    def upload_image(self, image_bytes, filename, catalog, folder_id=None, check_existing=True,
+                     mimetype='image/jpeg', existing=None):
+        """Upload with comprehensive error handling.
+
+        Pass folder_id and check_existing=False for names already resolved by
+        plan_uploads to skip the per-file folder and collision queries. A
+        same-named file whose md5Checksum matches the plate is kept and its
+        link returned instead of uploading a timestamped copy.
+        """
+        return self._upload(image_bytes, filename, catalog, folder_id, check_existing,
+                            mimetype, existing)[0]
+
+    def _upload(self, image_bytes, filename, catalog, folder_id=None, check_existing=True,
+                mimetype='image/jpeg', existing=None):
+        """upload_image returning (url, final_filename, skipped)"""
+        catalog_folder_id = folder_id
         try:
             logger.info(f"Starting upload: {filename} to catalog {catalog}")
             
+            service = self._service()
+
             # Create catalog-specific folder
-            catalog_folder_id = self.get_or_create_folder(catalog, self.main_folder_id)
+            catalog_folder_id = folder_id or self.get_or_create_folder(catalog, self.main_folder_id)
             logger.info(f"Using catalog folder ID: {catalog_folder_id}")
 
+            data = image_bytes.getvalue() if hasattr(image_bytes, 'getvalue') else bytes(image_bytes)
+
             # Check for existing files
-            existing_files = self.service.files().list(
-                q=f"name='{filename}' and parents in '{catalog_folder_id}'"
-            ).execute().get('files', [])
+            existing_files = [existing] if existing else []
+            if check_existing:
+                existing_files = service.files().list(
+                    q=f"name='{filename}' and parents in '{catalog_folder_id}' and trashed=false",
+                    fields=f"files({FILE_FIELDS})"
+                ).execute().get('files', [])
 
             if existing_files:
-                import datetime
-                timestamp = datetime.datetime.now().strftime("%H%M%S")
-                name_parts = filename.rsplit('.', 1)
-                filename = f"{name_parts[0]}_{timestamp}.{name_parts[1]}"
-                logger.info(f"File exists, renamed to: {filename}")
+                digest = content_md5(data)
+                same = next((f for f in existing_files if f.get('md5Checksum') == digest), None)
+                if same:
+                    logger.info(f"⏭️ Unchanged, kept existing {same['name']} ({len(data)} bytes not sent)")
+                    return same.get('webViewLink'), same['name'], True
+                if check_existing:
+                    filename = timestamped_name(filename)
+                    logger.info(f"File exists, renamed to: {filename}")
 
             # Upload file
-            logger.info(f"Uploading {len(image_bytes.getvalue())} bytes")
-            media = MediaIoBaseUpload(image_bytes, mimetype='image/jpeg', resumable=True)
-            file_metadata = {
-                'name': filename,
-                'parents': [catalog_folder_id]
-            }
-
-            file_result = self.service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id,webViewLink'
-            ).execute()
+            logger.info(f"Uploading {len(data)} bytes")
+            file_result = self._upload_resumable(service, data, filename, catalog_folder_id, mimetype)
 
             url = file_result.get('webViewLink')
             logger.info(f"✅ Upload successful: {filename} -> {url}")
-            return url
+            return url, filename, False
 
         except Exception as e:
             logger.error(f"❌ Upload error for {filename}: {str(e)}")
+            if is_missing_folder(e, catalog_folder_id):
+                # The cached catalog folder was deleted or moved; re-resolve next time.
+                # Other errors (5xx, dropped connections) leave a good cache alone
+                logger.warning(f"📁 Folder for {catalog} is gone, forgetting cached ID")
+                self.invalidate_folder(catalog)
             raise e
+
+    def _create_request(self, service, data, filename, folder_id, mimetype):
+        media = _ChunkUpload(
+            io.BytesIO(data), mimetype=mimetype, chunksize=self.chunk_size, resumable=True
+        )
+        return service.files().create(
+            body={'name': filename, 'parents': [folder_id]},
+            media_body=media,
+            fields='id,webViewLink'
+        )
+
+    def _backoff(self, attempt):
+        """Exponential backoff with full jitter, in seconds"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _upload_resumable(self, service, data, filename, folder_id, mimetype):
+        """Send data chunk by chunk, retrying transient errors with backoff.
+
+        The session URI is saved once Drive issues it, so a retry here or in a
+        later run asks Drive for the last confirmed byte and continues from
+        there. Consecutive failures without progress are capped at max_retries.
+        """
+        store = self.resume_store
+        key = store.key_for(data, folder_id, filename) if store else None
+        request = self._create_request(service, data, filename, folder_id, mimetype)
+        saved_uri = store.get(key) if store else None
+        if saved_uri:
+            request.resumable_uri = saved_uri
+            # googleapiclient's recovery path: the next call asks Drive for its
+            # confirmed offset ("bytes */N") before sending anything
+            request._in_error_state = True
+            logger.info(f"↩️ Resuming saved upload session for {filename}")
+
+        failures = 0
+        response = None
+        while response is None:
+            offset = request.resumable_progress
+            try:
+                _, response = request.next_chunk()
+            except Exception as e:
+                if store and request.resumable_uri and request.resumable_uri != saved_uri:
+                    saved_uri = request.resumable_uri
+                    store.put(key, saved_uri)
+                expired = (isinstance(e, HttpError) and e.resp.status in (404, 410)
+                           and request.resumable_uri)
+                if not (expired or is_transient(e)) or failures >= self.max_retries:
+                    raise
+                failures += 1
+                with self._retry_lock:
+                    self.retries += 1
+                if expired:
+                    # The session is gone; open a new one and start from zero
+                    logger.warning(f"⚠️ Upload session for {filename} expired, restarting")
+                    if store:
+                        store.discard(key)
+                    saved_uri = None
+                    request = self._create_request(service, data, filename, folder_id, mimetype)
+                    continue
+                delay = self._backoff(failures)
+                logger.warning(
+                    f"⚠️ Upload of {filename} interrupted at {request.resumable_progress}/{len(data)} "
+                    f"bytes ({e}); retry {failures}/{self.max_retries} in {delay:.1f}s"
+                )
+                time.sleep(delay)
+                continue
+            if store and request.resumable_uri and request.resumable_uri != saved_uri:
+                saved_uri = request.resumable_uri
+                store.put(key, saved_uri)
+            if request.resumable_progress > offset:
+                failures = 0
+
+        if store and saved_uri:
+            store.discard(key)
+        return response
+
+    def upload_many(self, entries, workers=4, max_in_flight=None, plan=True, stats=None):
+        """Upload many files through a bounded pool of worker threads.
+
+        entries is an iterable of dicts with "image_bytes", "filename",
+        "catalog" and optionally "mimetype", "folder_id", "existing" and "index". With plan=True the
+        entries are resolved up front by plan_uploads; with plan=False they
+        are consumed lazily, so a generator can stream files in. Yields
+        result dicts (index, filename, catalog, url, bytes, elapsed_s,
+        skipped, error) in completion order. Aggregate throughput (over the
+        time at least one upload was in flight, so a slow generator does not
+        count) and the bytes saved on unchanged files are logged and written into stats
+        (pass a dict to get this call's totals; last_upload_stats is shared
+        by every caller).
+        """
+        max_in_flight = max_in_flight or 2 * workers
+        if plan:
+            entries = list(entries)
+            planned = self.plan_uploads([(e["filename"], e["catalog"]) for e in entries])
+            entries = [
+                dict(e, folder_id=folder_id, filename=filename, existing=existing)
+                for e, (folder_id, filename, existing) in zip(entries, planned)
+            ]
+
+        def upload_one(entry):
+            t0 = time.perf_counter()
+            try:
+                url, filename, skipped = self._upload(
+                    entry["image_bytes"], entry["filename"], entry["catalog"],
+                    folder_id=entry.get("folder_id"),
+                    check_existing=not entry.get("folder_id"),
+                    mimetype=entry.get("mimetype", 'image/jpeg'),
+                    existing=entry.get("existing"),
+                )
+            finally:
+                t1 = time.perf_counter()
+                spans.append((t0, t1))
+            return url, filename, skipped, t1 - t0
+
+        def size_of(data):
+            return len(data.getvalue()) if hasattr(data, 'getvalue') else len(data)
+
+        stats = {} if stats is None else stats
+        stats.update(files=0, failed=0, bytes=0, skipped=0, bytes_saved=0)
+        retries_before = self.retries
+        # (start, end) of every upload; throughput counts only time with one in flight
+        spans = []
+        pending = {}
+        entry_iter = enumerate(entries)
+        exhausted = False
+
+        with ThreadPoolExecutor(max_workers=workers, initializer=self._init_upload_worker) as pool:
+            while True:
+                while not exhausted and len(pending) < max_in_flight:
+                    try:
+                        pos, entry = next(entry_iter)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending[pool.submit(upload_one, entry)] = (pos, entry)
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pos, entry = pending.pop(future)
+                    result = {
+                        "index": entry.get("index", pos),
+                        "filename": entry["filename"],
+                        "catalog": entry["catalog"],
+                        "url": None,
+                        "bytes": size_of(entry["image_bytes"]),
+                        "elapsed_s": 0.0,
+                        "skipped": False,
+                        "error": None,
+                    }
+                    try:
+                        (result["url"], result["filename"], result["skipped"],
+                         result["elapsed_s"]) = future.result()
+                        stats["files"] += 1
+                        if result["skipped"]:
+                            stats["skipped"] += 1
+                            stats["bytes_saved"] += result["bytes"]
+                        else:
+                            stats["bytes"] += result["bytes"]
+                    except Exception as e:
+                        result["error"] = str(e)
+                        stats["failed"] += 1
+                    yield result
+
+        # Entries may come from a generator still processing images; waiting on it
+        # (or on the consumer between yields) is not upload time
+        stats["elapsed_s"] = busy_seconds(spans)
+        stats["retries"] = self.retries - retries_before
+        stats["mb_per_s"] = stats["bytes"] / 1e6 / stats["elapsed_s"] if stats["elapsed_s"] else 0.0
+        self.last_upload_stats = stats
+        logger.info(
+            f"📊 Uploaded {stats['files']} file(s), {stats['failed']} failed, "
+            f"{stats['bytes'] / 1e6:.1f} MB in {stats['elapsed_s']:.1f}s "
+            f"({stats['mb_per_s']:.2f} MB/s), {stats['retries']} retried chunk(s); "
+            f"{stats['skipped']} unchanged file(s) skipped, {stats['bytes_saved'] / 1e6:.1f} MB saved"
+        )
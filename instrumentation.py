@@ -0,0 +1,192 @@
+import json
+import math
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def describe(obj):
+    """(pixel dimensions, byte size) of an image, array or bytes-like; None when unknown"""
+    if obj is None:
+        return None, None
+    if hasattr(obj, 'size') and hasattr(obj, 'mode') and hasattr(obj, 'getbands'):
+        w, h = obj.size
+        return [w, h], w * h * len(obj.getbands())
+    if hasattr(obj, 'shape') and hasattr(obj, 'nbytes'):
+        return list(obj.shape[1::-1]), int(obj.nbytes)
+    if hasattr(obj, 'getbuffer'):
+        return None, obj.getbuffer().nbytes
+    try:
+        return None, len(obj)
+    except TypeError:
+        return None, None
+
+
+class StageSpan:
+    """Handle yielded by StageRecorder.stage to attach inputs/outputs to the event"""
+
+    def __init__(self, event):
+        self.event = event
+
+    def input(self, obj):
+        self.event["in_size"], self.event["in_bytes"] = describe(obj)
+        return obj
+
+    def output(self, obj):
+        self.event["out_size"], self.event["out_bytes"] = describe(obj)
+        return obj
+
+
+class StageRecorder:
+    """Collects one event per pipeline stage: wall/CPU time, sizes and memory peak.
+
+    Events are dicts kept in a bounded in-process buffer and can be exported
+    as JSON lines or a Prometheus text-format file. tracemalloc peaks are
+    only recorded with trace_memory=True; they cover allocations reported to
+    tracemalloc (Python objects and NumPy buffers) and are process-wide, so
+    concurrent stages in one process share a peak.
+    """
+
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, trace_memory=False, max_events=10000):
+        self.trace_memory = trace_memory
+        self.events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        # Events ever recorded, and how many of them to_jsonl(append=True) has written
+        self._recorded = 0
+        self._appended = 0
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, status_callback=None, message=None, **labels):
+        """Time a stage; status_callback(message) fires first, as before"""
+        if status_callback and message:
+            status_callback(message)
+        event = {
+            "stage": name,
+            "ts": time.time(),
+            "in_size": None, "in_bytes": None,
+            "out_size": None, "out_bytes": None,
+            "mem_peak_bytes": None,
+        }
+        event.update(labels)
+        span = StageSpan(event)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            mem_start = tracemalloc.get_traced_memory()[0]
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield span
+            event["ok"] = True
+        except Exception:
+            event["ok"] = False
+            raise
+        finally:
+            event["wall_s"] = time.perf_counter() - wall0
+            event["cpu_s"] = time.process_time() - cpu0
+            if self.trace_memory:
+                event["mem_peak_bytes"] = tracemalloc.get_traced_memory()[1] - mem_start
+            with self._lock:
+                self.events.append(event)
+                self._recorded += 1
+
+    def extend(self, events):
+        """Add events recorded elsewhere, e.g. in batch worker processes"""
+        with self._lock:
+            self.events.extend(events)
+            self._recorded += len(events)
+
+    def drain(self):
+        """Remove and return all collected events"""
+        with self._lock:
+            events = list(self.events)
+            self.events.clear()
+        return events
+
+    def summary(self):
+        """{stage: {count, p50/p90/p99 wall seconds, mean cpu seconds, max memory peak}}"""
+        with self._lock:
+            events = list(self.events)
+        by_stage = {}
+        for ev in events:
+            by_stage.setdefault(ev["stage"], []).append(ev)
+
+        out = {}
+        for stage, evs in by_stage.items():
+            walls = sorted(ev["wall_s"] for ev in evs)
+            peaks = [ev["mem_peak_bytes"] for ev in evs if ev.get("mem_peak_bytes") is not None]
+            stats = {
+                "count": len(evs),
+                "errors": sum(1 for ev in evs if not ev.get("ok", True)),
+                "wall_sum_s": sum(walls),
+                "cpu_sum_s": sum(ev["cpu_s"] for ev in evs),
+                "mem_peak_max_bytes": max(peaks) if peaks else None,
+            }
+            for q in self.QUANTILES:
+                # Nearest rank: the smallest value with at least q of the samples at or below it
+                stats[f"p{int(q * 100)}_s"] = walls[max(0, math.ceil(q * len(walls)) - 1)]
+            out[stage] = stats
+        return out
+
+    def to_jsonl(self, path, append=False):
+        """Write the buffered events as JSON lines.
+
+        With append=True only events recorded since the last appending call
+        are added to the end of path, so a long-running process can keep one
+        log without the buffer's size limit.
+        """
+        with self._lock:
+            events = list(self.events)
+            if append:
+                new = min(self._recorded - self._appended, len(events))
+                events = events[len(events) - new:]
+                self._appended = self._recorded
+        with open(path, "a" if append else "w") as fh:
+            for ev in events:
+                fh.write(json.dumps(ev) + "\n")
+        logger.info(f"📝 Wrote {len(events)} stage event(s) to {path}")
+
+    def to_prometheus(self, path, prefix="platemaker_stage"):
+        """Write a Prometheus text-format file (e.g. for node_exporter's textfile collector)"""
+        lines = [
+            f"# HELP {prefix}_seconds Wall time per pipeline stage.",
+            f"# TYPE {prefix}_seconds summary",
+        ]
+        summary = self.summary()
+        for stage, s in summary.items():
+            for q in self.QUANTILES:
+                lines.append(f'{prefix}_seconds{{stage="{stage}",quantile="{q}"}} {s[f"p{int(q * 100)}_s"]:.6f}')
+            lines.append(f'{prefix}_seconds_sum{{stage="{stage}"}} {s["wall_sum_s"]:.6f}')
+            lines.append(f'{prefix}_seconds_count{{stage="{stage}"}} {s["count"]}')
+        lines += [
+            f"# HELP {prefix}_cpu_seconds_total CPU time spent per pipeline stage.",
+            f"# TYPE {prefix}_cpu_seconds_total counter",
+        ]
+        for stage, s in summary.items():
+            lines.append(f'{prefix}_cpu_seconds_total{{stage="{stage}"}} {s["cpu_sum_s"]:.6f}')
+        lines += [
+            f"# HELP {prefix}_errors_total Failed runs per pipeline stage.",
+            f"# TYPE {prefix}_errors_total counter",
+        ]
+        for stage, s in summary.items():
+            lines.append(f'{prefix}_errors_total{{stage="{stage}"}} {s["errors"]}')
+        lines += [
+            f"# HELP {prefix}_memory_peak_bytes Largest tracemalloc peak seen per stage.",
+            f"# TYPE {prefix}_memory_peak_bytes gauge",
+        ]
+        for stage, s in summary.items():
+            if s["mem_peak_max_bytes"] is not None:
+                lines.append(f'{prefix}_memory_peak_bytes{{stage="{stage}"}} {s["mem_peak_max_bytes"]}')
+        # Replaced atomically so a collector never reads a half-written file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            fh.write("\n".join(lines) + "\n")
+        os.replace(tmp, path)
@@ -0,0 +1,326 @@
+import copy
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+from batch_manifest import STAGE_PROCESSED, STAGE_UPLOADED, BatchManifest, input_hash
+from output_profiles import (
+    get_rendition,
+    output_filename,
+    profile_extension,
+    profile_for,
+    profile_mimetype,
+    rendition_folder,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """In-process queue that runs batch jobs off the Streamlit script thread.
+
+    submit() returns a job ID immediately; a small pool of job threads runs
+    process_batch and streams finished plates into the uploader while the
+    UI polls status(). Jobs outlive the session that queued them, so
+    reruns, refreshes and dropped connections do not interrupt them. With a
+    BatchManifest, items already done in an earlier run are resumed from
+    their checkpoint instead of being redone.
+    """
+
+    def __init__(self, platemaker, uploader, max_concurrent_jobs=2, keep_finished_s=3600,
+                 manifest=None):
+        self.platemaker = platemaker
+        self.uploader = uploader
+        self.manifest = manifest
+        self.keep_finished_s = keep_finished_s
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_jobs, thread_name_prefix="batch-job"
+        )
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, items, owner=None, profile=None, renditions=()):
+        """Queue a batch and return its job ID.
+
+        items is a list of dicts with "name", "image_bytes", "catalog" and
+        "design_number". profile overrides each catalog's output profile;
+        renditions names extra RENDITIONS uploaded next to each plate.
+        """
+        self._prune()
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "owner": owner,
+            "state": "queued",
+            "created": time.time(),
+            "finished": None,
+            "total": len(items),
+            "done": 0,
+            "upload_stats": None,
+            "renditions": list(renditions),
+            "items": [
+                {
+                    "name": item["name"],
+                    "catalog": item["catalog"],
+                    "design_number": item["design_number"],
+                    "profile": profile_for(item["catalog"], profile),
+                    "message": "⏳ Queued...",
+                    "status": "queued",
+                    "filename": None,
+                    "url": None,
+                    "rendition_urls": {},
+                    "error": None,
+                }
+                for item in items
+            ],
+        }
+        payloads = [item["image_bytes"] for item in items]
+        with self._lock:
+            self._jobs[job_id] = job
+        self._executor.submit(self._run, job, payloads)
+        logger.info(f"📥 Queued job {job_id} with {len(items)} image(s)")
+        return job_id
+
+    def status(self, job_id):
+        """Snapshot of a job, or None if unknown/expired"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return copy.deepcopy(job) if job else None
+
+    def jobs(self, owner=None):
+        """Snapshots of all jobs, or only those submitted with this owner key"""
+        with self._lock:
+            return [
+                copy.deepcopy(job) for job in self._jobs.values()
+                if owner is None or job["owner"] == owner
+            ]
+
+    def _prune(self):
+        cutoff = time.time() - self.keep_finished_s
+        with self._lock:
+            for job_id in [j for j, job in self._jobs.items()
+                           if job["finished"] and job["finished"] < cutoff]:
+                del self._jobs[job_id]
+
+    def _update(self, job, idx, **fields):
+        with self._lock:
+            job["items"][idx].update(fields)
+            if fields.get("status") in ("success", "error"):
+                job["done"] += 1
+
+    def _run(self, job, payloads):
+        with self._lock:
+            job["state"] = "running"
+        try:
+            # Jobs run alongside each other and the UI; httplib2 clients cannot be shared
+            self.uploader._init_upload_worker()
+            self._run_batch(job, payloads)
+            state = "done"
+        except Exception as e:
+            logger.error(f"Job {job['id']} failed: {str(e)}", exc_info=True)
+            with self._lock:
+                for item in job["items"]:
+                    if item["status"] not in ("success", "error"):
+                        item.update(status="error", error=str(e), message=f"❌ {str(e)}")
+                        job["done"] += 1
+            state = "failed"
+        with self._lock:
+            job["state"] = state
+            job["finished"] = time.time()
+
+    def _checkpoint(self, job, payloads):
+        """Register items in the manifest; return their keys and current rows"""
+        keys, rows = [], []
+        for idx, item in enumerate(job["items"]):
+            h = input_hash(payloads[idx])
+            key = BatchManifest.item_key(
+                h, item["catalog"], item["design_number"], item["profile"], job["renditions"]
+            )
+            rows.append(self.manifest.get(key))
+            self.manifest.record_queued(
+                key, job["id"], item["name"], h, item["catalog"], item["design_number"], item["profile"]
+            )
+            keys.append(key)
+        return keys, rows
+
+    def _run_batch(self, job, payloads):
+        items = job["items"]
+        keys, rows = [None] * len(items), [None] * len(items)
+        if self.manifest is not None:
+            keys, rows = self._checkpoint(job, payloads)
+
+        renditions = job["renditions"]
+        # Output files of an item: the plate (None) and each rendition
+        parts = [None, *renditions]
+        # Files already on Drive from an earlier, partly uploaded run
+        done = [{} for _ in items]
+
+        # Sort items by checkpoint: already uploaded, staged on disk, or to process
+        to_process, staged = [], []
+        for idx, row in enumerate(rows):
+            if row and row["stage"] == STAGE_UPLOADED and not row["failed"] and row["drive_url"]:
+                payloads[idx] = None
+                self.manifest.record_uploaded(keys[idx], row["output_file"], row["drive_url"])
+                self._update(job, idx, status="success", url=row["drive_url"],
+                             filename=row["output_file"],
+                             message=f"♻️ Already uploaded • [Drive]({row['drive_url']})")
+                continue
+            if row:
+                done[idx] = self.manifest.uploaded_files(keys[idx])
+                if done[idx]:
+                    with self._lock:
+                        items[idx]["rendition_urls"].update(
+                            (n, f["drive_url"]) for n, f in done[idx].items() if n is not None
+                        )
+                    if None in done[idx]:
+                        self._update(job, idx, url=done[idx][None]["drive_url"],
+                                     filename=done[idx][None]["output_file"])
+            if row and all(p in done[idx] for p in parts):
+                # Every file landed but the run stopped before the item was closed
+                payloads[idx] = None
+                plate = done[idx][None]
+                self.manifest.record_uploaded(keys[idx], plate["output_file"], plate["drive_url"])
+                self._update(job, idx, status="success",
+                             message=f"♻️ Already uploaded • [Drive]({plate['drive_url']})")
+                continue
+            files = self.manifest.staged_files(keys[idx]) if row and row["stage"] == STAGE_PROCESSED else {}
+            if row and row["stage"] == STAGE_PROCESSED and all(p in done[idx] or p in files for p in parts):
+                payloads[idx] = None
+                staged.append(idx)
+            else:
+                to_process.append(idx)
+        if len(to_process) < len(items):
+            logger.info(
+                f"🔁 Job {job['id']}: resuming, {len(to_process)} to process, "
+                f"{len(staged)} to upload, {len(items) - len(to_process) - len(staged)} already uploaded"
+            )
+
+        pending = staged + to_process
+        if not pending:
+            return
+
+        batch = []
+        for idx in to_process:
+            item = items[idx]
+
+            def cb(msg, i=idx):
+                self._update(job, i, message=msg, status="running")
+            batch.append({
+                "image": payloads[idx],
+                "catalog": item["catalog"],
+                "design_number": item["design_number"],
+                "profile": item["profile"],
+                "renditions": renditions,
+                "status_callback": cb,
+            })
+
+        def targets(idx):
+            """(rendition or None for the plate, folder name, file name, profile) per upload still needed"""
+            item = items[idx]
+            out = [(None, item["catalog"],
+                    output_filename(item["catalog"], item["design_number"], item["profile"]),
+                    item["profile"])]
+            for name in renditions:
+                r_profile = get_rendition(name)["profile"]
+                out.append((name, rendition_folder(item["catalog"], name),
+                            output_filename(item["catalog"], item["design_number"], r_profile),
+                            r_profile))
+            return [t for t in out if t[0] not in done[idx]]
+
+        # Resolve folders and name collisions for the whole batch up front
+        try:
+            parts = [(idx, t) for idx in pending for t in targets(idx)]
+            planned = self.uploader.plan_uploads([(t[2], t[1]) for _, t in parts])
+            plan = {(idx, t[0]): p for (idx, t), p in zip(parts, planned)}
+        except Exception as e:
+            logger.warning(f"Upload planning failed, checking per file: {e}")
+            plan = None
+
+        # Uploads still outstanding per item; an item is done when all its files are
+        remaining = {idx: len(targets(idx)) for idx in pending}
+        part_errors = {idx: [] for idx in pending}
+
+        def upload_entries(idx, files, note=""):
+            self._update(job, idx, message=f"☁️ Uploading to Google Drive{note}...")
+            for name, folder, filename, profile in targets(idx):
+                folder_id = existing = None
+                if plan:
+                    folder_id, filename, existing = plan[(idx, name)]
+                yield {
+                    "index": (idx, name),
+                    "image_bytes": files[name],
+                    "filename": filename,
+                    "catalog": folder,
+                    "folder_id": folder_id,
+                    "existing": existing,
+                    "mimetype": profile_mimetype(profile),
+                }
+
+        def processed_plates():
+            for idx in staged:
+                files = {}
+                for name, path in self.manifest.staged_files(keys[idx]).items():
+                    if name not in done[idx]:
+                        with open(path, "rb") as fh:
+                            files[name] = fh.read()
+                yield from upload_entries(idx, files, " (processed in an earlier run)")
+
+            for res in self.platemaker.process_batch(batch):
+                idx = to_process[res["index"]]
+                # The input is no longer needed once its plate exists
+                batch[res["index"]]["image"] = payloads[idx] = None
+                if res["error"]:
+                    if self.manifest is not None:
+                        self.manifest.record_failed(keys[idx], res["error"])
+                    self._update(job, idx, status="error", error=res["error"],
+                                 message=f"❌ Processing failed: {res['error']}")
+                    continue
+                if self.manifest is not None:
+                    # Renditions are staged as encoded so a resume re-sends identical bytes
+                    self.manifest.record_processed(
+                        keys[idx], res["image_bytes"], profile_extension(res["profile"]),
+                        {n: (r["image_bytes"], profile_extension(get_rendition(n)["profile"]))
+                         for n, r in res["renditions"].items()},
+                    )
+                enc = res["encode"]
+                files = {None: res["image_bytes"]}
+                files.update((n, r["image_bytes"]) for n, r in res["renditions"].items())
+                yield from upload_entries(idx, files, (
+                    f" ({enc['bytes'] / 1e6:.1f} MB {enc['profile']}, "
+                    f"encoded in {enc['encode_s']:.1f}s)"
+                ))
+
+        upload_stats = {}
+        for up in self.uploader.upload_many(processed_plates(), plan=False, stats=upload_stats):
+            idx, name = up["index"]
+            if up["error"]:
+                part_errors[idx].append(up["error"] if name is None else f"{name}: {up['error']}")
+            else:
+                if self.manifest is not None:
+                    self.manifest.record_file_uploaded(keys[idx], name, up["filename"], up["url"])
+                if name is None:
+                    self._update(job, idx, url=up["url"], filename=up["filename"])
+                else:
+                    with self._lock:
+                        items[idx]["rendition_urls"][name] = up["url"]
+            remaining[idx] -= 1
+            if remaining[idx]:
+                continue
+
+            item = items[idx]
+            if part_errors[idx]:
+                error = "; ".join(part_errors[idx])
+                if self.manifest is not None:
+                    self.manifest.record_failed(keys[idx], error)
+                self._update(job, idx, status="error", error=error,
+                             message=f"❌ Upload failed: {error}")
+            else:
+                if self.manifest is not None:
+                    self.manifest.record_uploaded(keys[idx], item["filename"], item["url"])
+                links = "".join(f" • [{n}]({u})" for n, u in item["rendition_urls"].items())
+                self._update(job, idx, status="success",
+                             message=f"✅ Uploaded • [Drive]({item['url']}){links}")
+        with self._lock:
+            job["upload_stats"] = upload_stats
@@ -0,0 +1,105 @@
+import io
+import time
+from pathlib import Path
+import logging
+
+from google_drive_uploader import busy_seconds, content_md5, timestamped_name
+
+logger = logging.getLogger(__name__)
+
+
+class LocalUploader:
+    """Stand-in for DriveUploader that writes plates to a local directory.
+
+    Catalog folders become subdirectories of output_dir and name collisions
+    are renamed the same way Drive uploads are, unless the existing file has
+    the same MD5, in which case it is kept. Returns file:// URLs.
+    """
+
+    def __init__(self, output_dir="plates_out"):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.last_upload_stats = None
+
+    def _init_upload_worker(self):
+        """Nothing per thread to set up; kept for interface parity with DriveUploader"""
+
+    def get_or_create_folder(self, folder_name, parent_id=None):
+        folder = self.output_dir / folder_name
+        folder.mkdir(parents=True, exist_ok=True)
+        return str(folder)
+
+    def plan_uploads(self, entries):
+        plan = []
+        taken = {}
+        for filename, catalog in entries:
+            folder_id = self.get_or_create_folder(catalog)
+            names = taken.setdefault(folder_id, {p.name for p in Path(folder_id).iterdir()})
+            path = Path(folder_id) / filename
+            existing = path if path.is_file() else None
+            if filename in names:
+                filename = timestamped_name(filename, names)
+            names.add(filename)
+            plan.append((folder_id, filename, existing))
+        return plan
+
+    def upload_image(self, image_bytes, filename, catalog, folder_id=None, check_existing=True,
+                     mimetype='image/jpeg', existing=None):
+        return self._upload(image_bytes, filename, catalog, folder_id, check_existing,
+                            mimetype, existing)[0]
+
+    def _upload(self, image_bytes, filename, catalog, folder_id=None, check_existing=True,
+                mimetype='image/jpeg', existing=None):
+        folder = Path(folder_id or self.get_or_create_folder(catalog))
+        data = image_bytes.getvalue() if isinstance(image_bytes, io.BytesIO) else bytes(image_bytes)
+        if check_existing and (folder / filename).exists():
+            existing = folder / filename
+            filename = timestamped_name(filename, {p.name for p in folder.iterdir()})
+        if existing and Path(existing).is_file() and \
+                content_md5(Path(existing).read_bytes()) == content_md5(data):
+            logger.info(f"⏭️ Unchanged, kept {existing}")
+            return Path(existing).resolve().as_uri(), Path(existing).name, True
+        path = folder / filename
+        path.write_bytes(data)
+        logger.info(f"💾 Wrote {len(data)} bytes to {path}")
+        return path.resolve().as_uri(), filename, False
+
+    def upload_many(self, entries, workers=1, max_in_flight=None, plan=True, stats=None):
+        entries = list(entries) if plan else entries
+        planned = self.plan_uploads([(e["filename"], e["catalog"]) for e in entries]) if plan else None
+        stats = {} if stats is None else stats
+        stats.update(files=0, failed=0, bytes=0, skipped=0, bytes_saved=0)
+        spans = []
+        for pos, entry in enumerate(entries):
+            folder_id, filename, existing = planned[pos] if planned else (
+                entry.get("folder_id"), entry["filename"], entry.get("existing")
+            )
+            data = entry["image_bytes"]
+            size = len(data.getvalue()) if hasattr(data, 'getvalue') else len(data)
+            result = {
+                "index": entry.get("index", pos), "filename": filename, "catalog": entry["catalog"],
+                "url": None, "bytes": size, "elapsed_s": 0.0, "skipped": False, "error": None,
+            }
+            t0 = time.perf_counter()
+            try:
+                result["url"], result["filename"], result["skipped"] = self._upload(
+                    data, filename, entry["catalog"], folder_id=folder_id,
+                    check_existing=not folder_id, mimetype=entry.get("mimetype", 'image/jpeg'),
+                    existing=existing,
+                )
+                stats["files"] += 1
+                if result["skipped"]:
+                    stats["skipped"] += 1
+                    stats["bytes_saved"] += size
+                else:
+                    stats["bytes"] += size
+            except Exception as e:
+                result["error"] = str(e)
+                stats["failed"] += 1
+            spans.append((t0, time.perf_counter()))
+            result["elapsed_s"] = spans[-1][1] - t0
+            yield result
+        # Only the writes; the entries generator may still be processing images
+        stats["elapsed_s"] = busy_seconds(spans)
+        stats["mb_per_s"] = stats["bytes"] / 1e6 / stats["elapsed_s"] if stats["elapsed_s"] else 0.0
+        self.last_upload_stats = stats
@@ -0,0 +1,125 @@
+import io
+import time
+from PIL import Image
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Named encoder settings for finished plates. "master" reproduces the
+# original save(format="JPEG", quality=100) output.
+OUTPUT_PROFILES = {
+    "master": {
+        "format": "JPEG", "quality": 100, "subsampling": 2,
+        "progressive": False, "optimize": False,
+    },
+    "high": {
+        "format": "JPEG", "quality": 95, "subsampling": 0,
+        "progressive": True, "optimize": True,
+    },
+    "balanced": {
+        "format": "JPEG", "quality": 88, "subsampling": 2,
+        "progressive": True, "optimize": True,
+    },
+    "webp": {
+        "format": "WEBP", "quality": 90, "method": 4,
+    },
+    "webp_small": {
+        "format": "WEBP", "quality": 80, "method": 6,
+    },
+    "share": {
+        "format": "JPEG", "quality": 85, "subsampling": 2,
+        "progressive": True, "optimize": True,
+    },
+    "thumb": {
+        "format": "JPEG", "quality": 80, "subsampling": 2,
+        "progressive": False, "optimize": True,
+    },
+}
+DEFAULT_PROFILE = "master"
+
+# Smaller copies of the finished plate. Each is downsampled from the next
+# larger one, encoded with its own profile and uploaded to a sibling of the
+# catalog folder ("Lavanya" -> "Lavanya - WhatsApp").
+RENDITIONS = {
+    "share": {"max_side": 1600, "profile": "share", "folder_suffix": " - WhatsApp"},
+    "thumb": {"max_side": 400, "profile": "thumb", "folder_suffix": " - Thumbnails"},
+}
+
+# Catalogs that should not use DEFAULT_PROFILE unless a batch overrides it
+CATALOG_PROFILES = {}
+
+FORMAT_INFO = {
+    "JPEG": ("jpg", "image/jpeg"),
+    "WEBP": ("webp", "image/webp"),
+}
+
+
+def profile_for(catalog, batch_profile=None):
+    """Profile name for a plate: the batch choice, else the catalog's, else the default"""
+    return batch_profile or CATALOG_PROFILES.get(catalog, DEFAULT_PROFILE)
+
+
+def get_profile(name):
+    if name not in OUTPUT_PROFILES:
+        raise ValueError(f"Unknown output profile: {name}")
+    return OUTPUT_PROFILES[name]
+
+
+def profile_extension(name):
+    return FORMAT_INFO[get_profile(name)["format"]][0]
+
+
+def profile_mimetype(name):
+    return FORMAT_INFO[get_profile(name)["format"]][1]
+
+
+def get_rendition(name):
+    if name not in RENDITIONS:
+        raise ValueError(f"Unknown rendition: {name}")
+    return RENDITIONS[name]
+
+
+def rendition_folder(catalog, name):
+    """Drive folder for a rendition, next to the catalog's own folder"""
+    return f"{catalog}{get_rendition(name)['folder_suffix']}"
+
+
+def output_filename(catalog, design_number, profile=None):
+    """Drive file name for a plate, e.g. "Lavanya - 4290.jpg" """
+    return f"{catalog} - {design_number}.{profile_extension(profile or DEFAULT_PROFILE)}"
+
+
+def encode_image(img, profile=DEFAULT_PROFILE):
+    """Encode img with a named profile.
+
+    Returns (data, stats) where stats has profile, format, bytes and encode_s.
+    """
+    settings = dict(get_profile(profile))
+    fmt = settings.pop("format")
+    buf = io.BytesIO()
+    t0 = time.perf_counter()
+    img.save(buf, format=fmt, **settings)
+    elapsed = time.perf_counter() - t0
+    data = buf.getvalue()
+    stats = {"profile": profile, "format": fmt, "bytes": len(data), "encode_s": elapsed}
+    logger.info(f"💾 Encoded {img.size} as {profile} ({fmt}): {len(data)} bytes in {elapsed:.2f}s")
+    return data, stats
+
+
+def render_renditions(img, names):
+    """[(name, image)] for the named renditions, largest first.
+
+    Each size is resampled from the previous (larger) rendition rather than
+    from the full plate, so every step only reads a small image.
+    """
+    specs = sorted(((n, get_rendition(n)) for n in names), key=lambda ns: -ns[1]["max_side"])
+    out = []
+    src = img
+    for name, spec in specs:
+        scale = spec["max_side"] / max(src.size)
+        if scale < 1:
+            size = (max(1, round(src.width * scale)), max(1, round(src.height * scale)))
+            # reducing_gap box-reduces by an integer factor before Lanczos
+            src = src.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        out.append((name, src))
+    return out
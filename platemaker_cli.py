@@ -0,0 +1,232 @@
+"""Headless bulk ingestion: run PlateMaker over a directory of photos.
+
+    python platemaker_cli.py photos/ --manifest shoot.csv --output-dir plates/
+    python platemaker_cli.py photos/ --manifest shoot.csv          # upload to Drive
+
+The manifest is a CSV with a header row and columns file, catalog and
+design_number (file is relative to the input directory). Progress is
+written to stdout as JSON lines, one event per processed/uploaded/failed
+item, followed by a final {"event": "summary", ...} line. Logs go to
+stderr. Exit status is 0 only if every item was uploaded.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+from output_profiles import OUTPUT_PROFILES, RENDITIONS
+from segmentation_models import DEFAULT_MODEL, GRAPH_OPTIMIZATION_LEVELS, SEGMENTATION_MODELS
+
+REQUIRED_COLUMNS = ("file", "catalog", "design_number")
+
+
+def emit(event, **fields):
+    """Write one machine-readable progress line"""
+    sys.stdout.write(json.dumps(dict(event=event, ts=round(time.time(), 3), **fields)) + "\n")
+    sys.stdout.flush()
+
+
+def read_manifest(manifest_path, input_dir):
+    """(items, errors): manifest rows with resolved paths, and rows that cannot run"""
+    items, errors = [], []
+    with open(manifest_path, newline="", encoding="utf-8-sig") as fh:
+        reader = csv.DictReader(fh)
+        missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"Manifest is missing column(s): {', '.join(missing)}")
+        for line_no, row in enumerate(reader, start=2):
+            name = (row["file"] or "").strip()
+            catalog = (row["catalog"] or "").strip()
+            design = (row["design_number"] or "").strip()
+            if not name or not catalog or not design:
+                errors.append({"line": line_no, "file": name, "error": "file/catalog/design_number missing"})
+                continue
+            path = Path(input_dir) / name
+            if not path.is_file():
+                errors.append({"line": line_no, "file": name, "error": "file not found"})
+                continue
+            items.append({"file": name, "path": path, "catalog": catalog, "design_number": design})
+    return items, errors
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Bulk-process saree photos into catalog plates.",
+        epilog="Progress and summary are JSON lines on stdout.",
+    )
+    parser.add_argument("input_dir", help="directory containing the photos")
+    parser.add_argument("--manifest", required=True, help="CSV with file,catalog,design_number")
+    parser.add_argument("--output-dir", help="write plates here instead of uploading to Google Drive")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processing worker processes (default: all cores)")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="images read and queued at once (default: 2x workers)")
+    parser.add_argument("--upload-workers", type=int, default=4, help="concurrent uploads")
+    parser.add_argument("--upload-chunk-mb", type=float, default=4.0,
+                        help="resumable upload chunk size; smaller chunks lose less on a dropped connection")
+    parser.add_argument("--profile", default=None, choices=list(OUTPUT_PROFILES),
+                        help="output profile for every plate")
+    parser.add_argument("--renditions", nargs="*", default=[], choices=list(RENDITIONS),
+                        help="extra sizes uploaded to sibling folders")
+    parser.add_argument("--model", default=DEFAULT_MODEL, choices=list(SEGMENTATION_MODELS),
+                        help="segmentation model (u2netp for quick proofs)")
+    parser.add_argument("--intra-op-threads", type=int, default=None,
+                        help="ONNX Runtime threads per inference (default: cores split across workers)")
+    parser.add_argument("--inter-op-threads", type=int, default=None,
+                        help="ONNX Runtime threads running independent graph nodes")
+    parser.add_argument("--graph-optimization", choices=GRAPH_OPTIMIZATION_LEVELS, default="all")
+    parser.add_argument("--seg-proxy-size", type=int, default=None,
+                        help="segment on a proxy of at most this many pixels on the long side")
+    parser.add_argument("--cache-dir", default=".bg_cache",
+                        help="background-removal cache directory ('' to disable)")
+    parser.add_argument("--credentials", default=None,
+                        help="Google OAuth client file (default: credentials.json next to this script)")
+    parser.add_argument("--stage-log", default=None,
+                        help="write one JSON line per pipeline stage run to this file")
+    parser.add_argument("--metrics-file", default=None,
+                        help="write per-stage timings in Prometheus text format to this file")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="record each stage's tracemalloc peak (slows processing)")
+    parser.add_argument("--verbose", action="store_true", help="log progress details to stderr")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+    input_dir = Path(args.input_dir).expanduser().resolve()
+    output_dir = Path(args.output_dir).expanduser().resolve() if args.output_dir else None
+    manifest = Path(args.manifest).expanduser().resolve()
+    credentials = Path(args.credentials).expanduser().resolve() if args.credentials else "credentials.json"
+    stage_log = Path(args.stage_log).expanduser().resolve() if args.stage_log else None
+    metrics_file = Path(args.metrics_file).expanduser().resolve() if args.metrics_file else None
+    # Asset paths in PlateMaker are relative to the repo
+    os.chdir(Path(__file__).resolve().parent)
+
+    # Heavy imports after argument parsing so --help stays fast
+    from output_profiles import (
+        get_rendition, output_filename, profile_for, profile_mimetype, rendition_folder,
+    )
+    from platemaker_module import PlateMaker
+
+    started = time.perf_counter()
+    items, errors = read_manifest(manifest, input_dir)
+    for err in errors:
+        emit("error", stage="manifest", **err)
+    emit("start", items=len(items), skipped=len(errors), workers=args.workers,
+         destination=str(output_dir) if output_dir else "drive")
+
+    if output_dir:
+        from local_uploader import LocalUploader
+        uploader = LocalUploader(output_dir)
+    else:
+        from google_drive_uploader import DriveUploader
+        uploader = DriveUploader(str(credentials), chunk_size=int(args.upload_chunk_mb * 1024 * 1024))
+
+    platemaker = PlateMaker(
+        model_name=args.model,
+        cache_dir=args.cache_dir or None,
+        seg_proxy_size=args.seg_proxy_size,
+        intra_op_threads=args.intra_op_threads,
+        inter_op_threads=args.inter_op_threads,
+        graph_optimization=args.graph_optimization,
+        trace_memory=args.trace_memory,
+        # With a pool the parent only coordinates; workers load and warm their own sessions
+        load_session=args.workers <= 1,
+    )
+
+    # One upload per plate plus one per rendition, planned together
+    targets = []
+    for idx, item in enumerate(items):
+        item["profile"] = profile_for(item["catalog"], args.profile)
+        targets.append((idx, None, item["catalog"], item["profile"]))
+        for name in args.renditions:
+            targets.append((idx, name, rendition_folder(item["catalog"], name),
+                            get_rendition(name)["profile"]))
+    planned = uploader.plan_uploads([
+        (output_filename(items[idx]["catalog"], items[idx]["design_number"], profile), folder)
+        for idx, _, folder, profile in targets
+    ])
+    plan = {(idx, name): (folder, profile, p)
+            for (idx, name, folder, profile), p in zip(targets, planned)}
+
+    counts = {"processed": 0, "uploaded": 0, "failed": len(errors)}
+    # Files still to upload per item; an item counts as uploaded once all of them are
+    remaining = {idx: 1 + len(args.renditions) for idx in range(len(items))}
+    failed = set()
+
+    def processed_plates():
+        batch = [
+            {"image": it["path"], "catalog": it["catalog"],
+             "design_number": it["design_number"], "profile": it["profile"]}
+            for it in items
+        ]
+        for res in platemaker.process_batch(batch, workers=args.workers,
+                                            max_in_flight=args.max_in_flight,
+                                            renditions=args.renditions):
+            item = items[res["index"]]
+            if res["error"]:
+                counts["failed"] += 1
+                emit("error", stage="process", file=item["file"], error=res["error"])
+                continue
+            counts["processed"] += 1
+            emit("processed", file=item["file"], elapsed_s=round(res["elapsed_s"], 3),
+                 bytes=res["encode"]["bytes"], encode_s=round(res["encode"]["encode_s"], 3))
+            for name in [None] + args.renditions:
+                folder, profile, (folder_id, filename, existing) = plan[(res["index"], name)]
+                yield {
+                    "index": (res["index"], name),
+                    "image_bytes": res["image_bytes"] if name is None else res["renditions"][name]["image_bytes"],
+                    "filename": filename,
+                    "catalog": folder,
+                    "folder_id": folder_id,
+                    "existing": existing,
+                    "mimetype": profile_mimetype(profile),
+                }
+
+    try:
+        for up in uploader.upload_many(processed_plates(), workers=args.upload_workers, plan=False):
+            idx, rendition = up["index"]
+            item = items[idx]
+            if up["error"]:
+                failed.add(idx)
+                emit("error", stage="upload", file=item["file"], rendition=rendition, error=up["error"])
+            else:
+                emit("uploaded", file=item["file"], rendition=rendition, name=up["filename"],
+                     url=up["url"], skipped=up["skipped"], elapsed_s=round(up["elapsed_s"], 3))
+            remaining[idx] -= 1
+            if not remaining[idx] and idx not in failed:
+                counts["uploaded"] += 1
+    finally:
+        platemaker.close()
+        if stage_log:
+            platemaker.recorder.to_jsonl(stage_log)
+        if metrics_file:
+            platemaker.recorder.to_prometheus(metrics_file)
+
+    elapsed = time.perf_counter() - started
+    emit(
+        "summary",
+        items=len(items) + len(errors),
+        processed=counts["processed"],
+        uploaded=counts["uploaded"],
+        failed=counts["failed"] + len(failed),
+        elapsed_s=round(elapsed, 3),
+        images_per_s=round(counts["uploaded"] / elapsed, 3) if elapsed else 0.0,
+        upload=uploader.last_upload_stats,
+        stages=platemaker.recorder.summary(),
+    )
+    return 0 if counts["failed"] + len(failed) == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,86 @@
 import io
-from PIL import Image, ImageDraw, ImageFont
-import rembg
+import os
+import re
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image, ImageDraw, ImageOps
 from pathlib import Path
 import logging
 
+from asset_cache import AssetCache, LRUDict
+from bg_cache import BackgroundCache
+from compositing import alpha_bbox, composite_foreground
+from instrumentation import StageRecorder
+from output_profiles import DEFAULT_PROFILE, encode_image, get_rendition, render_renditions
+from segmentation_models import DEFAULT_MODEL, create_session
+
 logger = logging.getLogger(__name__)
 
+def read_image_bytes(image_file):
+    """Bytes of an upload without extra copies.
+
+    getvalue() on a BytesIO (Streamlit's UploadedFile is one) hands back the
+    buffer it was built from, so this does not duplicate the upload the way
+    seek(0) + read() does. Paths (pathlib.Path) are read from disk, which
+    lets batch items stay unread until they are submitted. Plain
+    bytes/memoryviews are returned as-is.
+    """
+    if isinstance(image_file, os.PathLike):
+        with open(image_file, 'rb') as fh:
+            return fh.read()
+    if hasattr(image_file, 'getvalue'):
+        return image_file.getvalue()
+    if hasattr(image_file, 'read'):
+        try:
+            image_file.seek(0)
+        except Exception:
+            pass
+        return image_file.read()
+    return image_file
+
+
+# Per-process PlateMaker used by process_batch workers
+_worker_platemaker = None
+
+
+def _init_batch_worker(config):
+    """Process pool initializer: build one PlateMaker (and session) per worker"""
+    global _worker_platemaker
+    _worker_platemaker = PlateMaker(**config)
+
+
+def _process_batch_item(img_bytes, catalog, design_number, profile, renditions=()):
+    """Run the full pipeline in a worker and return the encoded plate and renditions"""
+    t0 = time.perf_counter()
+    img = _worker_platemaker.process_image(img_bytes, catalog, design_number)
+    data, encode_stats = _worker_platemaker.encode(img, profile, catalog)
+    extra = _worker_platemaker.encode_renditions(img, renditions, catalog)
+    # Stage events travel back with the result so the parent can collect them
+    return data, time.perf_counter() - t0, encode_stats, extra, _worker_platemaker.recorder.drain()
+
+
 class PlateMaker:
-    def __init__(self):
+    def __init__(self, model_name=DEFAULT_MODEL, warmup=True, cache_dir=".bg_cache",
+                 cache_max_bytes=2 * 1024**3, seg_proxy_size=None, trace_memory=False,
+                 intra_op_threads=None, inter_op_threads=None, graph_optimization="all",
+                 load_in_background=False, load_session=True):
+        # Kept so batch workers can build an identical PlateMaker
+        self._config = {
+            "model_name": model_name,
+            "warmup": warmup,
+            "cache_dir": cache_dir,
+            "cache_max_bytes": cache_max_bytes,
+            "seg_proxy_size": seg_proxy_size,
+            "trace_memory": trace_memory,
+            "intra_op_threads": intra_op_threads,
+            "inter_op_threads": inter_op_threads,
+            "graph_optimization": graph_optimization,
+        }
+        # Per-stage timing/memory events for process_image and encode
+        self.recorder = StageRecorder(trace_memory=trace_memory)
         # Your existing configuration
         self.FRAME_W, self.FRAME_H = 5000, 4000
         self.SIDE_PAD = 40
@@ -26,81 +99,184 @@ class PlateMaker:
             logger.warning(f"Font file not found: {self.FONT_PATH}")
         if not Path(self.LOGO_PATH).exists():
             logger.warning(f"Logo file not found: {self.LOGO_PATH}")
+        self.assets = AssetCache(self.LOGO_PATH, self.FONT_PATH, self.FALLBACK_FONTS)
+
+        # Font fitting memo: fitted size per text, measured width per (text, size),
+        # and last fitted size per banner shape (text with digits masked)
+        self._fit_cache = LRUDict(1024)
+        self._width_cache = LRUDict(4096)
+        self._fit_hints = LRUDict(256)
+
+        # Rendered static banner text (catalog part), keyed by (text, font size);
+        # each is a strip just the size of the text's ink, a few MB at most
+        self._banner_strips = LRUDict(16)
+
+        # Segment on a proxy no larger than this on its long side (None = full size);
+        # smaller is faster, larger keeps finer edges
+        self.SEG_PROXY_SIZE = seg_proxy_size
+
+        # One inference session for the lifetime of this PlateMaker; the model
+        # is any SEGMENTATION_MODELS entry, thread counts None = onnxruntime's choice
+        self.MODEL_NAME = model_name
+        self.INTRA_OP_THREADS = intra_op_threads
+        self.INTER_OP_THREADS = inter_op_threads
+        self.GRAPH_OPTIMIZATION = graph_optimization
+        self.session = None
+        self.startup_timings = {"import_s": 0.0, "session_create_s": 0.0, "warmup_s": 0.0}
+        self._session_ready = threading.Event()
+        self._session_error = None
+        self._load_started = False
+        self._load_lock = threading.Lock()
+        if load_in_background:
+            # The app can render while the model loads; segmentation waits for it
+            self._start_load(background=True)
+        elif load_session:
+            self.wait_ready()
+        # load_session=False (a parent that only feeds batch workers) loads on first use
+
+        # Batch engine: worker processes and how many images may be in flight
+        self.BATCH_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+        self._pool = None
+        self._pool_workers = 0
+        # Background jobs may run batches concurrently
+        # Re-entrant: _get_pool calls close() to resize
+        self._pool_lock = threading.RLock()
+
+        # Bump when anything that changes the segmentation output changes
+        self.SEGMENTATION_VERSION = "2"
+        self.bg_cache = None
+        if cache_dir:
+            self.bg_cache = BackgroundCache(
+                cache_dir, max_bytes=cache_max_bytes, version=self.cache_version()
+            )
 
-    def process_image(self, image_file, catalog, design_number, status_callback=None):
-        """Main processing method with comprehensive error handling"""
+    def cache_version(self):
+        """Config fingerprint that cached foregrounds are keyed on"""
+        return f"seg{self.SEGMENTATION_VERSION}:{self.MODEL_NAME}:proxy{self.SEG_PROXY_SIZE}"
+
+    def _start_load(self, background=False):
+        """Load the session once, here or on a background thread"""
+        with self._load_lock:
+            if self._load_started:
+                return
+            self._load_started = True
+        if background:
+            threading.Thread(
+                target=self._load_session, args=(self._config["warmup"],), name="model-load", daemon=True
+            ).start()
+        else:
+            self._load_session(self._config["warmup"])
+
+    def _load_session(self, warmup):
         try:
-            if status_callback:
-                status_callback("📤 Reading image...")
-
-            # Convert uploaded file to bytes
-            if hasattr(image_file, 'read'):
-                try:
-                    image_file.seek(0)
-                except Exception:
-                    pass
-                img_bytes = image_file.read()
-                logger.info(f"Read {len(img_bytes)} bytes from uploaded file")
-            else:
-                img_bytes = image_file
-
-            if not img_bytes or len(img_bytes) == 0:
-                raise ValueError("Image file is empty")
-
-            filename = image_file.name if hasattr(image_file, 'name') else 'uploaded_image'
-            logger.info(f"Processing: {filename} with catalog: {catalog}")
-
-            if status_callback:
-                status_callback("🎭 Removing background...")
+            self._init_session(warmup)
+        except Exception as e:
+            logger.error(f"Failed to load segmentation model: {str(e)}", exc_info=True)
+            self._session_error = e
+        finally:
+            self._session_ready.set()
+
+    def wait_ready(self, timeout=None):
+        """Block until the segmentation session is loaded.
+
+        Starts a deferred load, returns False on timeout and re-raises a
+        failed load.
+        """
+        self._start_load()
+        if not self._session_ready.wait(timeout):
+            return False
+        if self._session_error is not None:
+            raise RuntimeError(f"Segmentation model failed to load: {self._session_error}") from self._session_error
+        return True
+
+    @property
+    def ready(self):
+        return self._session_ready.is_set() and self._session_error is None
+
+    def _init_session(self, warmup=True):
+        """Create the rembg session once and optionally warm it up"""
+        t0 = time.perf_counter()
+        # rembg pulls in onnxruntime, scipy, scikit-image and pymatting; only
+        # pay for that when a session is actually needed
+        import rembg
+        self.startup_timings["import_s"] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        self.session = create_session(
+            self.MODEL_NAME, self.INTRA_OP_THREADS, self.INTER_OP_THREADS, self.GRAPH_OPTIMIZATION
+        )
+        self.startup_timings["session_create_s"] = time.perf_counter() - t0
+        logger.info(
+            f"🧠 Created rembg session '{self.MODEL_NAME}' "
+            f"(intra-op {self.INTRA_OP_THREADS or 'auto'}, inter-op {self.INTER_OP_THREADS or 'auto'}, "
+            f"graph opt {self.GRAPH_OPTIMIZATION}) in {self.startup_timings['session_create_s']:.2f}s"
+        )
 
-            # Background removal with error handling
+        if warmup:
+            # First inference pays for ONNX graph allocation; do it up front
+            t0 = time.perf_counter()
             try:
-                fg = self.remove_bg_from_bytes(img_bytes)
-                logger.info("Background removal successful")
+                rembg.remove(Image.new("RGB", (64, 64), "white"), session=self.session)
             except Exception as e:
-                logger.error(f"Background removal failed: {str(e)}")
-                raise Exception(f"Background removal failed: {str(e)}")
+                logger.warning(f"rembg warm-up failed: {str(e)}")
+            self.startup_timings["warmup_s"] = time.perf_counter() - t0
+            logger.info(f"🔥 Warmed up rembg session in {self.startup_timings['warmup_s']:.2f}s")
 
-            if status_callback:
-                status_callback("📏 Processing image...")
+    def process_image(self, image_file, catalog, design_number, status_callback=None):
+        """Main processing method with comprehensive error handling.
 
-            # Continue with your existing processing...
-            fg = self.trim_transparent(fg)
-            fg = self.downsize(fg, self.FRAME_W, self.FRAME_H)
+        Every stage is recorded as an event on self.recorder; status_callback
+        still receives the same progress messages.
+        """
+        stage = self.recorder.stage
+        try:
+            with stage("read", status_callback, "📤 Reading image...", catalog=catalog) as span:
+                # Uploaded file -> bytes, shared read-only from here on
+                img_bytes = read_image_bytes(image_file)
+                if hasattr(image_file, 'read'):
+                    logger.info(f"Read {len(img_bytes)} bytes from uploaded file")
 
-            if status_callback:
-                status_callback("🏷️ Adding logo overlay...")
+                if not img_bytes or len(img_bytes) == 0:
+                    raise ValueError("Image file is empty")
+                span.output(img_bytes)
 
-            fg_canvas = Image.new("RGBA", fg.size, (0,0,0,0))
-            fg_canvas.paste(fg, (0,0), fg)
-            fg_canvas = self.add_logo_overlay(fg_canvas, (0,0), (fg.width, fg.height))
-            fg = fg_canvas
+            filename = image_file.name if hasattr(image_file, 'name') else 'uploaded_image'
+            logger.info(f"Processing: {filename} with catalog: {catalog}")
 
-            if status_callback:
-                status_callback("✏️ Creating banner...")
+            # Background removal with error handling
+            with stage("remove_bg", status_callback, "🎭 Removing background...", catalog=catalog) as span:
+                span.input(img_bytes)
+                try:
+                    fg = span.output(self.remove_bg_from_bytes(img_bytes))
+                    logger.info("Background removal successful")
+                except Exception as e:
+                    logger.error(f"Background removal failed: {str(e)}")
+                    raise Exception(f"Background removal failed: {str(e)}")
 
-            banner_text = self.make_banner_text(catalog, design_number)
-            font = self.best_font(banner_text, self.FRAME_W)
-            tw, th = self.text_wh(banner_text, font)
-            banner_h = th + 2 * self.BANNER_PAD_Y
+            # remove_bg_from_bytes already trimmed fg to its opaque bounds
+            with stage("downsize", status_callback, "📏 Processing image...", catalog=catalog) as span:
+                fg = span.output(self.downsize(span.input(fg), self.FRAME_W, self.FRAME_H))
 
-            if status_callback:
-                status_callback("🎨 Composing final image...")
+            with stage("logo", status_callback, "🏷️ Adding logo overlay...", catalog=catalog) as span:
+                logo, logo_pos = self.logo_placement((fg.width, fg.height))
+                span.output(logo)
 
-            cv = self.make_canvas(banner_h)
-            draw = ImageDraw.Draw(cv)
-            bx = self.SIDE_PAD + (self.FRAME_W - tw)//2
-            by = self.TOP_PAD + (banner_h - th)//2
-            draw.text((bx, by), banner_text, font=font, fill=self.TEXT_COLOR)
+            with stage("banner", status_callback, "✏️ Creating banner...", catalog=catalog):
+                layout = self.banner_layout(catalog, design_number)
 
-            sx = self.SIDE_PAD + (self.FRAME_W - fg.width)//2
-            sy = self.TOP_PAD + banner_h + (self.FRAME_H - fg.height)//2
-            cv.paste(fg, (sx, sy), fg)
+            with stage("compose", status_callback, "🎨 Composing final image...", catalog=catalog) as span:
+                span.input(fg)
+                cv = self.plate_canvas(layout)
+                banner_h = layout["banner_h"]
+
+                # Foreground and logo are blended straight onto the RGB canvas
+                sx = self.SIDE_PAD + (self.FRAME_W - fg.width)//2
+                sy = self.TOP_PAD + banner_h + (self.FRAME_H - fg.height)//2
+                span.output(composite_foreground(cv, fg, (sx, sy), logo, logo_pos))
 
             if status_callback:
                 status_callback("✅ Image processing complete!")
 
-            return cv.convert("RGB")
+            return cv
 
         except Exception as e:
             logger.error(f"Error in process_image: {str(e)}", exc_info=True)
@@ -108,29 +284,250 @@ class PlateMaker:
                 status_callback(f"❌ Processing failed: {str(e)}")
             raise e
 
+    def encode(self, img, profile=DEFAULT_PROFILE, catalog=None):
+        """encode_image with an "encode" stage event"""
+        with self.recorder.stage("encode", catalog=catalog, profile=profile) as span:
+            span.input(img)
+            data, encode_stats = encode_image(img, profile)
+            span.output(data)
+        return data, encode_stats
+
+    def encode_renditions(self, img, renditions, catalog=None):
+        """{name: {"image_bytes", "encode"}} for the named renditions of a finished plate.
+
+        All sizes come from one pass over the composed canvas (see
+        render_renditions), each encoded with its rendition's own profile.
+        """
+        out = {}
+        if not renditions:
+            return out
+        with self.recorder.stage("renditions", catalog=catalog) as span:
+            span.input(img)
+            rendered = render_renditions(img, renditions)
+        for name, small in rendered:
+            data, encode_stats = self.encode(small, get_rendition(name)["profile"], catalog)
+            out[name] = {"image_bytes": data, "encode": encode_stats}
+        return out
+
+    def _get_pool(self, workers):
+        """Lazily start (or resize) the worker pool; workers stay warm between batches"""
+        with self._pool_lock:
+            if self._pool is not None and self._pool_workers != workers:
+                self.close()
+            if self._pool is None:
+                config = dict(self._config)
+                # Workers segment from their first item; pay the first-inference cost at startup
+                config["warmup"] = True
+                # Split the cores between workers instead of each session taking all of them
+                if not config["intra_op_threads"]:
+                    config["intra_op_threads"] = max(1, (os.cpu_count() or 1) // workers)
+                logger.info(
+                    f"⚙️ Starting batch pool with {workers} worker(s), "
+                    f"{config['intra_op_threads']} intra-op thread(s) each"
+                )
+                self._pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    # spawn: onnxruntime threads do not survive fork
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_batch_worker,
+                    initargs=(config,),
+                )
+                self._pool_workers = workers
+            return self._pool
+
+    def close(self):
+        """Shut down the batch worker pool"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+                self._pool_workers = 0
+
+    def _discard_broken_pool(self, pool):
+        """Tear down a pool whose worker died; the next batch starts a fresh one"""
+        with self._pool_lock:
+            # Dead workers cannot be waited on; shutting down still reaps their handles
+            pool.shutdown(wait=False, cancel_futures=True)
+            # Another job may already have replaced it
+            if self._pool is pool:
+                self._pool = None
+                self._pool_workers = 0
+
+    def process_batch(self, items, workers=None, max_in_flight=None, status_callback=None,
+                      profile=DEFAULT_PROFILE, renditions=()):
+        """Process many images across a process pool.
+
+        items is an iterable of dicts with "image" (bytes, file-like or Path),
+        "catalog", "design_number" and optional per-item "status_callback",
+        "profile" (output profile name, defaulting to profile) and
+        "renditions" (RENDITIONS names, defaulting to renditions).
+        Items are read lazily and at most max_in_flight are submitted at once,
+        so peak memory stays bounded. Yields result dicts in completion order:
+        index, catalog, design_number, profile, image_bytes, encode (size and
+        encode time), renditions ({name: {"image_bytes", "encode"}}),
+        elapsed_s and error.
+        """
+        workers = workers or self.BATCH_WORKERS
+        max_in_flight = max_in_flight or 2 * workers
+
+        def result(idx, item, image_bytes=None, elapsed=0.0, encode=None, error=None, extra=None):
+            return {
+                "index": idx,
+                "catalog": item["catalog"],
+                "design_number": item["design_number"],
+                "profile": item.get("profile") or profile,
+                "image_bytes": image_bytes,
+                "encode": encode,
+                "renditions": extra or {},
+                "elapsed_s": elapsed,
+                "error": error,
+            }
+
+        def notify(item, msg):
+            cb = item.get("status_callback") or status_callback
+            if cb:
+                cb(msg)
+
+        if workers <= 1:
+            # No pool: same contract, processed inline
+            for idx, item in enumerate(items):
+                t0 = time.perf_counter()
+                try:
+                    img = self.process_image(
+                        read_image_bytes(item["image"]), item["catalog"], item["design_number"],
+                        status_callback=item.get("status_callback") or status_callback,
+                    )
+                    data, encode_stats = self.encode(img, item.get("profile") or profile, item["catalog"])
+                    extra = self.encode_renditions(img, item.get("renditions", renditions), item["catalog"])
+                    yield result(idx, item, data, time.perf_counter() - t0, encode_stats, extra=extra)
+                except Exception as e:
+                    yield result(idx, item, elapsed=time.perf_counter() - t0, error=str(e))
+            return
+
+        pool = self._get_pool(workers)
+        pending = {}
+        item_iter = enumerate(items)
+        exhausted = False
+
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                try:
+                    idx, item = next(item_iter)
+                except StopIteration:
+                    exhausted = True
+                    break
+                try:
+                    img_bytes = read_image_bytes(item["image"])
+                    if not img_bytes:
+                        raise ValueError("Image file is empty")
+                    future = pool.submit(
+                        _process_batch_item, img_bytes, item["catalog"],
+                        item["design_number"], item.get("profile") or profile,
+                        tuple(item.get("renditions", renditions)),
+                    )
+                except Exception as e:
+                    notify(item, f"❌ Processing failed: {str(e)}")
+                    yield result(idx, item, error=str(e))
+                    continue
+                pending[future] = (idx, item)
+                notify(item, "🎭 Processing in worker...")
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx, item = pending.pop(future)
+                try:
+                    image_bytes, elapsed, encode_stats, extra, events = future.result()
+                    self.recorder.extend(events)
+                except Exception as e:
+                    logger.error(f"Batch item {idx} failed: {str(e)}")
+                    if isinstance(e, BrokenProcessPool):
+                        self._discard_broken_pool(pool)
+                    notify(item, f"❌ Processing failed: {str(e)}")
+                    yield result(idx, item, error=str(e))
+                    continue
+                notify(item, "✅ Image processing complete!")
+                yield result(idx, item, image_bytes, elapsed, encode_stats, extra=extra)
+
     def remove_bg_from_bytes(self, img_bytes):
-        """Background removal with error handling"""
+        """Background removal with error handling.
+
+        Returns the trimmed RGBA foreground, served from the on-disk cache
+        when the same bytes were segmented before.
+        """
         try:
+            cache_key = None
+            if self.bg_cache is not None:
+                cache_key = self.bg_cache.key_for(img_bytes)
+                cached = self.bg_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"♻️ Background cache hit: {cached.size}")
+                    return cached
+
+            self.wait_ready()
             logger.info(f"Attempting to remove background from {len(img_bytes)} bytes")
-            out_bytes = rembg.remove(img_bytes)
-            logger.info(f"Background removal returned {len(out_bytes)} bytes")
+            if self.SEG_PROXY_SIZE:
+                result_img = self.remove_bg_with_proxy(img_bytes, self.SEG_PROXY_SIZE)
+            else:
+                # Passing a PIL image makes rembg return one too, skipping the
+                # PNG encode/decode round-trip that bytes input costs
+                import rembg
+                src = Image.open(io.BytesIO(img_bytes))
+                result_img = rembg.remove(src, session=self.session)
 
-            if not out_bytes or len(out_bytes) == 0:
-                raise ValueError("Background removal returned empty result")
+                if result_img is None or result_img.width == 0 or result_img.height == 0:
+                    raise ValueError("Background removal returned empty result")
 
-            result_img = Image.open(io.BytesIO(out_bytes)).convert("RGBA")
+                if result_img.mode != "RGBA":
+                    result_img = result_img.convert("RGBA")
             logger.info(f"Created PIL image: {result_img.size}")
+            result_img = self.trim_transparent(result_img)
+
+            if cache_key is not None:
+                self.bg_cache.put(cache_key, result_img)
             return result_img
 
         except Exception as e:
             logger.error(f"Background removal error: {str(e)}")
             raise Exception(f"Background removal failed: {str(e)}")
 
-    def trim_transparent(self, img):
-        """Your exact original method"""
+    def remove_bg_with_proxy(self, img_bytes, proxy_size):
+        """Segment a downscaled proxy and apply its upsampled mask to the original pixels"""
+        src = ImageOps.exif_transpose(Image.open(io.BytesIO(img_bytes)))
+        if src.mode != "RGB":
+            src = src.convert("RGB")
+
+        proxy = src
+        scale = proxy_size / max(src.size)
+        if scale < 1:
+            size = (max(1, round(src.width * scale)), max(1, round(src.height * scale)))
+            # reducing_gap box-reduces the decoded frame first; no full-size copies
+            proxy = src.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+        logger.info(f"Segmenting proxy {proxy.size} for source {src.size}")
+
+        import rembg
+        mask = rembg.remove(proxy, session=self.session, only_mask=True)
+        if mask.mode != "L":
+            mask = mask.convert("L")
+        if mask.size != src.size:
+            mask = mask.resize(src.size, Image.Resampling.BILINEAR)
+
+        # Same cutout rembg does: masked pixels over fully transparent black.
+        # Image.composite is a copy of the empty layer plus this paste; pasting
+        # into a fresh layer gives the same pixels with one full frame fewer,
+        # and rebinding src frees the RGB frame once its RGBA copy exists
+        src = src.convert("RGBA")
+        cutout = Image.new("RGBA", src.size, 0)
+        cutout.paste(src, None, mask)
+        return cutout
+
+    def trim_transparent(self, img, alpha_threshold=0):
+        """Crop to pixels whose alpha is above alpha_threshold"""
         if img.mode != "RGBA":
             img = img.convert("RGBA")
-        bbox = img.getbbox()
+        bbox = alpha_bbox(img, alpha_threshold)
         return img.crop(bbox) if bbox else img
 
     def downsize(self, img, box_w, box_h):
@@ -143,61 +540,69 @@ class PlateMaker:
             Image.Resampling.LANCZOS
         )
 
+    def banner_layout(self, catalog, design_number):
+        """Font and positions for a plate's banner"""
+        banner_text = self.make_banner_text(catalog, design_number)
+        font = self.best_font(banner_text, self.FRAME_W)
+        tw, th = self.text_wh(banner_text, font)
+        banner_h = th + 2 * self.BANNER_PAD_Y
+        return {
+            "text": banner_text,
+            # Everything but the design number: the same for a whole catalog
+            "static_text": self.make_banner_text(catalog, ""),
+            "design": str(design_number),
+            "font": font,
+            "banner_h": banner_h,
+            "bx": self.SIDE_PAD + (self.FRAME_W - tw)//2,
+            "by": self.TOP_PAD + (banner_h - th)//2,
+        }
+
+    def plate_canvas(self, layout):
+        """Fresh canvas with the banner drawn; the catalog text is pasted from a cached strip"""
+        font = layout["font"]
+        static = layout["static_text"]
+        if not layout["text"].startswith(static):
+            # Banner format without a shared prefix; draw it whole
+            cv = self.make_canvas(layout["banner_h"])
+            ImageDraw.Draw(cv).text((layout["bx"], layout["by"]), layout["text"],
+                                    font=font, fill=self.TEXT_COLOR)
+            return cv
+
+        l, t, r, b = font.getbbox(static)
+        key = (static, font.size)
+        strip = self._banner_strips.get(key)
+        if strip is None:
+            # Text on white pasted onto the white canvas gives the same pixels as drawing it there
+            strip = Image.new("RGB", (max(1, r - l), max(1, b - t)), "white")
+            ImageDraw.Draw(strip).text((-l, -t), static, font=font, fill=self.TEXT_COLOR)
+            self._banner_strips.put(key, strip)
+
+        cv = self.make_canvas(layout["banner_h"])
+        cv.paste(strip, (layout["bx"] + l, layout["by"] + t))
+        # Continue at the static text's advance; renders the same as drawing the whole string
+        ImageDraw.Draw(cv).text((layout["bx"] + font.getlength(static), layout["by"]),
+                                layout["text"][len(static):], font=font, fill=self.TEXT_COLOR)
+        return cv
+
     def make_canvas(self, banner_h):
         """Your exact original method"""
         w = self.FRAME_W + 2 * self.SIDE_PAD
         h = self.TOP_PAD + banner_h + self.FRAME_H + self.BOTTOM_PAD
         return Image.new("RGB", (w, h), "white")
 
-    def add_logo_overlay(self, canvas, fg_pos, fg_size, 
-                        size_ratio=0.20, opacity=0.31, margin=100):
-        """Your exact original logo overlay method"""
-        canvas = canvas.convert("RGBA")
-
-        # Load & resize logo
-        logo = Image.open(self.LOGO_PATH).convert("RGBA")
-        target_w = int(fg_size[0] * size_ratio)
-        scale = target_w / logo.width
-        logo = logo.resize(
-            (target_w, int(logo.height * scale)),
-            Image.Resampling.LANCZOS
-        )
-
-        # Fade alpha
-        alpha = logo.split()[3].point(lambda p: int(p * opacity))
-        logo.putalpha(alpha)
-
-        # Compute position within saree region
-        sx, sy = fg_pos
+    def logo_placement(self, fg_size, size_ratio=0.20, opacity=0.31, margin=100):
+        """Faded logo and its position relative to a foreground of fg_size"""
+        logo = self.assets.faded_logo(int(fg_size[0] * size_ratio), opacity)
         fw, fh = fg_size
-        lx = sx + fw - logo.width - margin
-        ly = sy + fh - logo.height - margin
-
-        canvas.paste(logo, (lx, ly), logo)
-        return canvas
+        return logo, (fw - logo.width - margin, fh - logo.height - margin)
 
     def make_banner_text(self, name, design):
         """Your exact original banner format"""
         return f"{name} 6.30 D.No {design}"
 
     def load_font(self, pts):
-        """Your exact original font loading with variable font support"""
-        try:
-            return ImageFont.truetype(
-                self.FONT_PATH, pts,
-                layout_engine=ImageFont.LAYOUT_RAQM,
-                font_variation={"wght":800,"ital":1}
-            )
-        except Exception:
-            try:
-                return ImageFont.truetype(self.FONT_PATH, pts)
-            except Exception:
-                for fb in self.FALLBACK_FONTS:
-                    try:
-                        return ImageFont.truetype(fb, pts)
-                    except OSError:
-                        continue
-                return ImageFont.load_default()
+        """Variable font at pts, parsed once per size by the asset cache"""
+        return self.assets.font(pts)
 
     def text_wh(self, txt, font):
         """Your exact original method"""
@@ -205,9 +610,45 @@ class PlateMaker:
         return x1 - x0, y1 - y0
 
     def best_font(self, txt, max_w):
-        """Your exact original auto-sizing font method"""
-        for size in range(self.MAX_FONT_SIZE, self.MIN_FONT_SIZE - 1, -2):
-            f = self.load_font(size)
-            if self.text_wh(txt, f)[0] <= max_w:
-                return f
-        return self.load_font(self.MIN_FONT_SIZE)
+        """Largest font (MAX_FONT_SIZE down to MIN_FONT_SIZE, step 2) whose text fits max_w"""
+        key = (txt, max_w)
+        size = self._fit_cache.get(key)
+        if size is None:
+            size = self._fit_size(txt, max_w)
+            self._fit_cache.put(key, size)
+        return self.load_font(size)
+
+    def _text_width(self, txt, size):
+        key = (txt, size)
+        w = self._width_cache.get(key)
+        if w is None:
+            w = self.text_wh(txt, self.load_font(size))[0]
+            self._width_cache.put(key, w)
+        return w
+
+    def _fit_size(self, txt, max_w):
+        sizes = list(range(self.MAX_FONT_SIZE, self.MIN_FONT_SIZE - 1, -2))
+
+        def fits(i):
+            return self._text_width(txt, sizes[i]) <= max_w
+
+        # Banners differing only in the design number nearly always fit at the
+        # same size; confirming the previous answer costs two measurements
+        shape = (re.sub(r"\d", "0", txt), max_w)
+        hint = self._fit_hints.get(shape)
+        if hint in sizes:
+            i = sizes.index(hint)
+            if fits(i) and (i == 0 or not fits(i - 1)):
+                return hint
+
+        # Width grows with size: binary search for the first size that fits
+        lo, hi = 0, len(sizes)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if fits(mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        size = sizes[lo] if lo < len(sizes) else self.MIN_FONT_SIZE
+        self._fit_hints.put(shape, size)
+        return size
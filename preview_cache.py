@@ -0,0 +1,67 @@
+import base64
+import io
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+import logging
+
+from asset_cache import LRUDict
+
+logger = logging.getLogger(__name__)
+
+
+def make_thumbnail(data, max_size, quality=60):
+    """JPEG thumbnail bytes; JPEG sources are decoded at reduced scale via draft mode"""
+    img = Image.open(io.BytesIO(data))
+    # Lets libjpeg decode at 1/2, 1/4 or 1/8 scale instead of full resolution
+    img.draft("RGB", max_size)
+    img = img.convert("RGB")
+    img.thumbnail(max_size)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+class PreviewCache:
+    """Thumbnails keyed by upload uid and size, shared across reruns and tabs.
+
+    Misses are decoded in a thread pool; each upload is only read when its
+    thumbnail is not cached yet.
+    """
+
+    def __init__(self, max_entries=2000, workers=4):
+        self._cache = LRUDict(max_entries)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preview")
+
+    def get_many(self, files_by_uid, max_size=(140, 140), quality=60):
+        """{uid: JPEG bytes or None} for {uid: uploaded file}"""
+        out = {}
+        futures = {}
+        for uid, f in files_by_uid.items():
+            key = (uid, max_size, quality)
+            thumb = self._cache.get(key)
+            if thumb is not None:
+                out[uid] = thumb
+                continue
+            try:
+                data = f.getvalue() if hasattr(f, 'getvalue') else f
+            except Exception:
+                out[uid] = None
+                continue
+            futures[uid] = self._executor.submit(make_thumbnail, data, max_size, quality)
+
+        for uid, future in futures.items():
+            try:
+                thumb = future.result()
+                self._cache.put((uid, max_size, quality), thumb)
+                out[uid] = thumb
+            except Exception as e:
+                logger.warning(f"Could not build preview for {uid}: {str(e)}")
+                out[uid] = None
+        return out
+
+    def data_urls(self, files_by_uid, max_size=(140, 140), quality=60):
+        """{uid: data: URL ("" on failure)} for use in st.data_editor image columns"""
+        return {
+            uid: f"data:image/jpeg;base64,{base64.b64encode(thumb).decode('utf-8')}" if thumb else ""
+            for uid, thumb in self.get_many(files_by_uid, max_size, quality).items()
+        }
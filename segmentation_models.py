@@ -0,0 +1,120 @@
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Background-removal models PlateMaker can run, lightest first. "session" is
+# the rembg session class name; entries with a "model_path" load a local ONNX
+# file through that class instead of downloading one.
+SEGMENTATION_MODELS = {
+    "u2netp": {
+        "session": "u2netp",
+        "description": "U²-Net small (4.7 MB): fastest, softer edges; good for quick proofs",
+    },
+    "silueta": {
+        "session": "silueta",
+        "description": "U²-Net pruned (43 MB): near-u2net masks at a fraction of the size",
+    },
+    "u2net-int8": {
+        "session": "u2net_custom",
+        "model_path": "models/u2net_int8.onnx",
+        "description": "u2net with INT8 dynamic quantization; build with "
+                       "benchmarks/bench_models.py --quantize",
+    },
+    "u2net": {
+        "session": "u2net",
+        "description": "U²-Net (176 MB): the default general-purpose model",
+    },
+    "isnet-general-use": {
+        "session": "isnet-general-use",
+        "description": "IS-Net (179 MB): heavier, finer edges on zari and fringes",
+    },
+}
+DEFAULT_MODEL = "u2net"
+
+# ONNX Runtime graph optimization levels by name
+GRAPH_OPTIMIZATION_LEVELS = ("disable", "basic", "extended", "all")
+
+
+def get_model(name):
+    if name not in SEGMENTATION_MODELS:
+        raise ValueError(
+            f"Unknown segmentation model: {name} (choose from {', '.join(SEGMENTATION_MODELS)})"
+        )
+    return SEGMENTATION_MODELS[name]
+
+
+def session_options(intra_op_threads=None, inter_op_threads=None, graph_optimization="all"):
+    """onnxruntime.SessionOptions for a PlateMaker session.
+
+    None leaves a thread count to onnxruntime (one intra-op thread per
+    core), which oversubscribes the CPU when several sessions run at once.
+    """
+    import onnxruntime as ort
+
+    levels = {
+        "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }
+    if graph_optimization not in levels:
+        raise ValueError(f"Unknown graph optimization level: {graph_optimization}")
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = levels[graph_optimization]
+    if intra_op_threads:
+        opts.intra_op_num_threads = intra_op_threads
+    if inter_op_threads:
+        opts.inter_op_num_threads = inter_op_threads
+        # Inter-op threads only help when independent nodes can run in parallel
+        opts.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+    return opts
+
+
+def _session_class(model_name):
+    from rembg.sessions import sessions_class
+
+    spec = get_model(model_name)
+    session_class = next((sc for sc in sessions_class if sc.name() == spec["session"]), None)
+    if session_class is None:
+        raise ValueError(f"rembg has no session class '{spec['session']}' for model {model_name}")
+    return session_class
+
+
+def model_file(model_name):
+    """Local path of a model's ONNX file, downloading rembg's weights if needed"""
+    spec = get_model(model_name)
+    if "model_path" in spec:
+        return spec["model_path"]
+    return _session_class(model_name).download_models()
+
+
+def create_session(model_name=DEFAULT_MODEL, intra_op_threads=None, inter_op_threads=None,
+                   graph_optimization="all"):
+    """A rembg session for a SEGMENTATION_MODELS entry with explicit ORT settings.
+
+    The session class is built directly (not through rembg.new_session) so
+    OMP_NUM_THREADS in the environment cannot override the thread counts.
+    """
+    spec = get_model(model_name)
+    session_class = _session_class(model_name)
+    kwargs = {}
+    if "model_path" in spec:
+        if not os.path.exists(spec["model_path"]):
+            raise FileNotFoundError(f"Model file for {model_name} not found: {spec['model_path']}")
+        kwargs["model_path"] = spec["model_path"]
+    opts = session_options(intra_op_threads, inter_op_threads, graph_optimization)
+    return session_class(spec["session"], opts, **kwargs)
+
+
+def quantize_model(src_path, dst_path):
+    """Write an INT8 dynamically quantized copy of an ONNX model (needs the onnx package)"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(os.path.dirname(dst_path) or ".", exist_ok=True)
+    quantize_dynamic(str(src_path), str(dst_path), weight_type=QuantType.QUInt8)
+    logger.info(
+        f"🗜️ Quantized {src_path} ({os.path.getsize(src_path) / 1e6:.0f} MB) -> "
+        f"{dst_path} ({os.path.getsize(dst_path) / 1e6:.0f} MB)"
+    )
+    return dst_path
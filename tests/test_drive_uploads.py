@@ -0,0 +1,185 @@
+"""DriveUploader against fake_drive_server: checksums and resumable sessions.
+
+    python -m pytest tests/test_drive_uploads.py
+"""
+import json
+import os
+import sys
+import time
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fake_drive_server import Faults, serve  # noqa: E402
+from google_drive_uploader import CHUNK_UNIT, DriveUploader, content_md5  # noqa: E402
+
+
+class ScriptedFaults(Faults):
+    """Faults injected in a fixed order, one entry per chunk PUT, then none"""
+
+    def __init__(self, *script):
+        super().__init__()
+        self.script = list(script)
+
+    def pick(self):
+        return self.script.pop(0) if self.script else None
+
+
+@pytest.fixture
+def fake_drive():
+    server, drive = serve(faults=ScriptedFaults())
+    yield server, drive
+    server.shutdown()
+    server.server_close()
+
+
+def make_uploader(server, tmp_path, **kwargs):
+    host, port = server.server_address
+    return DriveUploader(
+        credentials=Credentials("fake"),
+        api_endpoint=f"http://{host}:{port}/",
+        chunk_size=CHUNK_UNIT,
+        backoff_base=0.0,
+        resume_store=str(tmp_path / ".upload_sessions.json"),
+        **kwargs,
+    )
+
+
+def plate_bytes(size):
+    return os.urandom(size)
+
+
+def stored(drive, filename):
+    [record] = [f for f in drive.files.values() if f["name"] == filename]
+    return record
+
+
+def test_upload_through_faults_stores_matching_checksum(fake_drive, tmp_path):
+    server, drive = fake_drive
+    drive.faults = Faults(error_rate=0.2, drop_rate=0.1, partial_rate=0.2, seed=7)
+    uploader = make_uploader(server, tmp_path, max_retries=20)
+    data = plate_bytes(6 * CHUNK_UNIT + 1234)
+
+    uploader.upload_image(data, "Lavanya - 4290.jpg", "Lavanya")
+
+    record = stored(drive, "Lavanya - 4290.jpg")
+    assert sum(drive.stats["faults"].values()) > 0
+    assert int(record["size"]) == len(data)
+    assert record["md5Checksum"] == content_md5(data)
+
+
+def test_failed_upload_resumes_from_saved_session(fake_drive, tmp_path):
+    server, drive = fake_drive
+    # Two chunks land, only half the third is taken, then the retry gets a 503
+    drive.faults = ScriptedFaults(None, None, "partial", "error")
+    uploader = make_uploader(server, tmp_path, max_retries=0)
+    data = plate_bytes(5 * CHUNK_UNIT + 99)
+
+    with pytest.raises(Exception):
+        uploader.upload_image(data, "Lavanya - 4291.jpg", "Lavanya")
+
+    sessions = json.loads((tmp_path / ".upload_sessions.json").read_text())
+    [entry] = sessions.values()
+    [session] = drive.sessions.values()
+    confirmed = len(session["data"])
+    assert confirmed == 2 * CHUNK_UNIT + CHUNK_UNIT // 2
+    assert entry["uri"].endswith(next(iter(drive.sessions)))
+
+    # A later run picks the session up from disk
+    sent_before = drive.stats["bytes_received"]
+    uploader = make_uploader(server, tmp_path)
+    uploader.upload_image(data, "Lavanya - 4291.jpg", "Lavanya", check_existing=False)
+
+    assert drive.stats["uploads_started"] == 1
+    assert drive.stats["bytes_received"] - sent_before == len(data) - confirmed
+    assert stored(drive, "Lavanya - 4291.jpg")["md5Checksum"] == content_md5(data)
+    # Finished sessions are forgotten
+    assert json.loads((tmp_path / ".upload_sessions.json").read_text()) == {}
+
+
+def test_expired_session_starts_a_new_upload(fake_drive, tmp_path):
+    server, drive = fake_drive
+    drive.faults = ScriptedFaults(None, "error")
+    uploader = make_uploader(server, tmp_path, max_retries=0)
+    data = plate_bytes(3 * CHUNK_UNIT + 5)
+
+    with pytest.raises(Exception):
+        uploader.upload_image(data, "Lavanya - 4295.jpg", "Lavanya")
+    store = tmp_path / ".upload_sessions.json"
+    [entry] = json.loads(store.read_text()).values()
+
+    # Drive forgets sessions after about a week; the saved URI now answers 404
+    drive.sessions.clear()
+    sent_before = drive.stats["bytes_received"]
+    uploader = make_uploader(server, tmp_path)
+    uploader.upload_image(data, "Lavanya - 4295.jpg", "Lavanya", check_existing=False)
+
+    assert drive.stats["uploads_started"] == 2
+    assert drive.stats["bytes_received"] - sent_before == len(data)
+    assert stored(drive, "Lavanya - 4295.jpg")["md5Checksum"] == content_md5(data)
+    assert uploader.retries == 1
+    assert json.loads(store.read_text()) == {}
+
+
+def test_trashed_copy_is_not_kept_as_unchanged(fake_drive, tmp_path):
+    server, drive = fake_drive
+    uploader = make_uploader(server, tmp_path)
+    data = plate_bytes(CHUNK_UNIT)
+    trashed_url = uploader.upload_image(data, "Lavanya - 4292.jpg", "Lavanya")
+    stored(drive, "Lavanya - 4292.jpg")["trashed"] = True
+
+    url = uploader.upload_image(data, "Lavanya - 4292.jpg", "Lavanya")
+
+    assert drive.stats["uploads_completed"] == 2
+    assert url != trashed_url
+
+
+def test_upload_many_throughput_excludes_generator_time(fake_drive, tmp_path):
+    server, _ = fake_drive
+    uploader = make_uploader(server, tmp_path)
+    process_s = 0.3
+
+    def plates():
+        for i in range(3):
+            time.sleep(process_s)
+            yield {"image_bytes": plate_bytes(CHUNK_UNIT), "filename": f"Lavanya - 43{i}.jpg",
+                   "catalog": "Lavanya"}
+
+    stats = {}
+    results = list(uploader.upload_many(plates(), plan=False, stats=stats))
+
+    assert not any(r["error"] for r in results)
+    assert stats["elapsed_s"] < process_s
+    assert stats["elapsed_s"] >= max(r["elapsed_s"] for r in results)
+
+
+def test_folder_cache_survives_transient_errors(fake_drive, tmp_path):
+    server, drive = fake_drive
+    uploader = make_uploader(server, tmp_path, max_retries=0)
+    uploader.upload_image(plate_bytes(CHUNK_UNIT), "Lavanya - 4300.jpg", "Lavanya")
+    folder_id = uploader.get_or_create_folder("Lavanya", uploader.main_folder_id)
+
+    drive.faults = ScriptedFaults("error")
+    with pytest.raises(Exception):
+        uploader.upload_image(plate_bytes(CHUNK_UNIT), "Lavanya - 4301.jpg", "Lavanya")
+    assert uploader._cached_folder("Lavanya", uploader.main_folder_id) == folder_id
+
+
+def test_deleted_folder_is_resolved_again(fake_drive, tmp_path):
+    server, drive = fake_drive
+    uploader = make_uploader(server, tmp_path)
+    uploader.upload_image(plate_bytes(CHUNK_UNIT), "Lavanya - 4310.jpg", "Lavanya")
+    old_folder = uploader.get_or_create_folder("Lavanya", uploader.main_folder_id)
+    drive.delete(old_folder)
+
+    with pytest.raises(Exception):
+        uploader.upload_image(plate_bytes(CHUNK_UNIT), "Lavanya - 4311.jpg", "Lavanya",
+                              folder_id=old_folder, check_existing=False)
+    assert uploader._cached_folder("Lavanya", uploader.main_folder_id) is None
+
+    uploader.upload_image(plate_bytes(CHUNK_UNIT), "Lavanya - 4311.jpg", "Lavanya")
+    new_folder = uploader.get_or_create_folder("Lavanya", uploader.main_folder_id)
+    assert new_folder != old_folder
+    assert stored(drive, "Lavanya - 4311.jpg")["parents"] == [new_folder]
@@ -0,0 +1,54 @@
+"""StageRecorder summaries and exports.
+
+    python -m pytest tests/test_instrumentation.py
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from instrumentation import StageRecorder  # noqa: E402
+
+
+def recorder_with(walls, stage="segment"):
+    rec = StageRecorder()
+    rec.extend([{"stage": stage, "wall_s": w, "cpu_s": w, "ok": True} for w in walls])
+    return rec
+
+
+def test_quantiles_use_nearest_rank():
+    s = recorder_with([1.0, 2.0]).summary()["segment"]
+    assert s["p50_s"] == 1.0
+    assert s["p99_s"] == 2.0
+
+    s = recorder_with([float(i) for i in range(1, 11)]).summary()["segment"]
+    assert (s["p50_s"], s["p90_s"], s["p99_s"]) == (5.0, 9.0, 10.0)
+
+
+def test_append_writes_only_new_events(tmp_path):
+    rec = StageRecorder()
+    log = tmp_path / "stages.jsonl"
+    with rec.stage("segment"):
+        pass
+    rec.to_jsonl(log, append=True)
+    rec.to_jsonl(log, append=True)
+    with rec.stage("encode"):
+        pass
+    rec.to_jsonl(log, append=True)
+
+    stages = [json.loads(line)["stage"] for line in log.read_text().splitlines()]
+    assert stages == ["segment", "encode"]
+
+
+def test_prometheus_file(tmp_path):
+    rec = StageRecorder(trace_memory=True)
+    with rec.stage("segment"):
+        bytearray(1_000_000)
+    path = tmp_path / "platemaker.prom"
+    rec.to_prometheus(path)
+
+    text = path.read_text()
+    assert 'platemaker_stage_seconds_count{stage="segment"} 1' in text
+    assert 'platemaker_stage_memory_peak_bytes{stage="segment"}' in text
+    assert not list(tmp_path.glob("*.tmp"))
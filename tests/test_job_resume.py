@@ -0,0 +1,75 @@
+"""JobQueue resuming a partly uploaded batch from its BatchManifest.
+
+    python -m pytest tests/test_job_resume.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from batch_manifest import BatchManifest  # noqa: E402
+from job_queue import JobQueue  # noqa: E402
+from local_uploader import LocalUploader  # noqa: E402
+
+
+class FakePlateMaker:
+    """process_batch stand-in; rendition bytes differ on every run, like a lossy re-encode"""
+
+    def __init__(self):
+        self.processed = 0
+
+    def process_batch(self, batch):
+        for i, item in enumerate(batch):
+            self.processed += 1
+            yield {
+                "index": i,
+                "error": None,
+                "image_bytes": b"plate:" + item["image"],
+                "profile": item["profile"],
+                "encode": {"bytes": 0, "profile": item["profile"], "encode_s": 0.0},
+                "renditions": {n: {"image_bytes": os.urandom(64)} for n in item["renditions"]},
+            }
+
+
+class FlakyUploader(LocalUploader):
+    """Fails uploads into the given folders until fail_folders is emptied"""
+
+    def __init__(self, output_dir, fail_folders=()):
+        super().__init__(output_dir)
+        self.fail_folders = set(fail_folders)
+
+    def _upload(self, image_bytes, filename, catalog, *args, **kwargs):
+        if catalog in self.fail_folders:
+            raise ConnectionError("upload dropped")
+        return super()._upload(image_bytes, filename, catalog, *args, **kwargs)
+
+
+def run_job(queue, items):
+    job_id = queue.submit(items, renditions=["thumb"])
+    while queue.status(job_id)["state"] in ("queued", "running"):
+        time.sleep(0.01)
+    return queue.status(job_id)
+
+
+def test_resume_skips_renditions_already_uploaded(tmp_path):
+    manifest = BatchManifest(tmp_path / "manifest.sqlite3", staging_dir=tmp_path / "staged")
+    uploader = FlakyUploader(tmp_path / "drive", fail_folders={"Heritage"})
+    platemaker = FakePlateMaker()
+    queue = JobQueue(platemaker, uploader, manifest=manifest)
+    items = [{"name": "h2.jpg", "image_bytes": b"photo", "catalog": "Heritage", "design_number": "2"}]
+
+    first = run_job(queue, items)
+    assert first["items"][0]["status"] == "error"
+
+    uploader.fail_folders.clear()
+    second = run_job(queue, items)
+
+    item = second["items"][0]
+    assert item["status"] == "success"
+    assert set(item["rendition_urls"]) == {"thumb"}
+    # Uploaded from the staged plate, not processed again
+    assert platemaker.processed == 1
+    assert [p.name for p in (tmp_path / "drive" / "Heritage - Thumbnails").iterdir()] == ["Heritage - 2.jpg"]
+    assert [p.name for p in (tmp_path / "drive" / "Heritage").iterdir()] == ["Heritage - 2.jpg"]
+    assert list((tmp_path / "staged").iterdir()) == []
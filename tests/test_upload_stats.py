@@ -0,0 +1,38 @@
+"""upload_many throughput figures when entries come from a slow generator.
+
+    python -m pytest tests/test_upload_stats.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from google_drive_uploader import busy_seconds  # noqa: E402
+from local_uploader import LocalUploader  # noqa: E402
+
+PROCESS_S = 0.2
+
+
+def slow_entries(n, size):
+    """Entries that each take PROCESS_S to produce, like plates still being made"""
+    for i in range(n):
+        time.sleep(PROCESS_S)
+        yield {"image_bytes": os.urandom(size), "filename": f"Lavanya - {i}.jpg", "catalog": "Lavanya"}
+
+
+def test_busy_seconds_merges_overlapping_spans():
+    assert busy_seconds([]) == 0.0
+    assert busy_seconds([(0, 2), (1, 3), (5, 6)]) == 4
+    assert busy_seconds([(5, 6), (0, 3), (1, 2)]) == 4
+
+
+def test_generator_time_is_not_upload_time(tmp_path):
+    uploader = LocalUploader(tmp_path)
+    stats = {}
+    results = list(uploader.upload_many(slow_entries(3, 200_000), plan=False, stats=stats))
+
+    assert stats["files"] == 3 and stats["bytes"] == 600_000
+    assert stats["elapsed_s"] < PROCESS_S
+    assert stats["elapsed_s"] >= max(r["elapsed_s"] for r in results)
+    assert stats["mb_per_s"] == stats["bytes"] / 1e6 / stats["elapsed_s"]
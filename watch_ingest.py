@@ -0,0 +1,350 @@
+"""Watch-folder ingestion: turn photos dropped into a directory into plates.
+
+    python watch_ingest.py /srv/studio-drop
+    python watch_ingest.py /srv/studio-drop --output-dir plates/ --once
+
+Catalog and design number come from a sidecar JSON next to the photo
+(IMG_0001.jpg + IMG_0001.json with {"catalog": ..., "design_number": ...})
+or, failing that, from the file name: "<catalog> - <design>.jpg", the
+same convention plates are named with. Files are picked up only once
+their size and mtime have stopped changing for --settle seconds, so
+half-copied exports are left alone. Every item is checkpointed in the BatchManifest by content
+hash, so restarts, renamed copies and re-exports of the same photo are not
+processed or uploaded twice.
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+
+from batch_manifest import STAGE_PROCESSED, STAGE_UPLOADED, BatchManifest, input_hash
+from output_profiles import (
+    OUTPUT_PROFILES, RENDITIONS, get_rendition, output_filename, profile_extension, profile_for,
+    profile_mimetype, rendition_folder,
+)
+from segmentation_models import DEFAULT_MODEL, GRAPH_OPTIMIZATION_LEVELS, SEGMENTATION_MODELS
+
+logger = logging.getLogger("watch_ingest")
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff"}
+# "Lavanya - 4290.jpg", "Kanak Silk - A12.jpeg"; camera names like IMG_0001 do not match
+FILENAME_PATTERN = re.compile(r"^(?P<catalog>.+?)\s+-\s+(?P<design>[A-Za-z0-9]+)$")
+WATCH_BATCH_ID = "watch"
+
+
+def parse_item_name(path):
+    """(catalog, design_number) from a sidecar JSON or the file name, or None"""
+    sidecar = path.with_suffix(".json")
+    if sidecar.exists():
+        try:
+            meta = json.loads(sidecar.read_text(encoding="utf-8"))
+            catalog = str(meta.get("catalog", "")).strip()
+            design = str(meta.get("design_number", "")).strip()
+            if catalog and design:
+                return catalog, design
+            logger.warning(f"Sidecar {sidecar.name} lacks catalog/design_number")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read sidecar {sidecar.name}: {str(e)}")
+    match = FILENAME_PATTERN.match(path.stem)
+    if match:
+        return match.group("catalog").strip(), match.group("design")
+    return None
+
+
+def file_signature(path):
+    """Cheap change detector for a photo and its sidecar"""
+    st = path.stat()
+    sidecar = path.with_suffix(".json")
+    side = sidecar.stat().st_mtime_ns if sidecar.exists() else None
+    return st.st_size, st.st_mtime_ns, side
+
+
+class FolderWatcher:
+    """Polls a directory and runs settled new or changed photos through PlateMaker.
+
+    Files are handled one at a time in arrival order, which keeps memory flat
+    and throughput steady on an unattended studio PC. A file is only looked
+    at again when its size, mtime or sidecar changes; failures are retried
+    after retry_s. Stage events are appended to stage_log and the Prometheus
+    file at metrics_file is rewritten after every scan that handled files.
+    """
+
+    def __init__(self, platemaker, uploader, watch_dir, manifest, profile=None,
+                 settle_s=5.0, poll_s=2.0, retry_s=300.0, recursive=False,
+                 stage_log=None, metrics_file=None, renditions=()):
+        self.platemaker = platemaker
+        self.uploader = uploader
+        self.watch_dir = Path(watch_dir)
+        self.manifest = manifest
+        self.profile = profile
+        self.renditions = list(renditions)
+        self.settle_s = settle_s
+        self.poll_s = poll_s
+        self.retry_s = retry_s
+        self.recursive = recursive
+        self.stage_log = stage_log
+        self.metrics_file = metrics_file
+        # path -> (signature, first seen with that signature)
+        self._settling = {}
+        # path -> (signature, retry at or None)
+        self._handled = {}
+        self.stats = {"processed": 0, "uploaded": 0, "skipped": 0, "failed": 0, "unnamed": 0}
+
+    def _candidates(self):
+        files = self.watch_dir.rglob("*") if self.recursive else self.watch_dir.iterdir()
+        for path in files:
+            if path.suffix.lower() in IMAGE_EXTENSIONS and not path.name.startswith(".") and path.is_file():
+                yield path
+
+    def scan(self):
+        """Paths whose contents have settled and not been handled in this state"""
+        now = time.time()
+        ready = []
+        seen = set()
+        for path in self._candidates():
+            seen.add(path)
+            try:
+                sig = file_signature(path)
+            except OSError:
+                continue
+            handled = self._handled.get(path)
+            if handled and handled[0] == sig and (handled[1] is None or handled[1] > now):
+                continue
+
+            settling = self._settling.get(path)
+            if settling is None or settling[0] != sig:
+                self._settling[path] = (sig, now)
+                continue
+            # Unchanged across polls and not touched for settle_s
+            if now - settling[1] >= self.settle_s and now - sig[1] / 1e9 >= self.settle_s:
+                ready.append(path)
+
+        # Forget files that were moved away
+        for path in set(self._settling) - seen:
+            del self._settling[path]
+        for path in set(self._handled) - seen:
+            del self._handled[path]
+        return sorted(ready, key=lambda p: self._settling[p][1])
+
+    def process_file(self, path):
+        """Process and upload one settled file; returns the outcome string"""
+        sig = self._settling.pop(path)[0]
+        names = parse_item_name(path)
+        if names is None:
+            logger.warning(f"⚠️ Skipping {path.name}: no sidecar and name is not '<catalog> - <design>'")
+            self.stats["unnamed"] += 1
+            self._handled[path] = (sig, None)
+            return "unnamed"
+        catalog, design_number = names
+        profile = profile_for(catalog, self.profile)
+
+        data = path.read_bytes()
+        # The file may have been rewritten between the signature and the read
+        if file_signature(path) != sig:
+            return "changed"
+        h = input_hash(data)
+        key = BatchManifest.item_key(h, catalog, design_number, profile, self.renditions)
+        row = self.manifest.get(key)
+        self.manifest.record_queued(key, WATCH_BATCH_ID, path.name, h, catalog, design_number, profile)
+
+        if row and row["stage"] == STAGE_UPLOADED and not row["failed"] and row["drive_url"]:
+            self.manifest.record_uploaded(key, row["output_file"], row["drive_url"])
+            logger.info(f"♻️ {path.name}: identical content already uploaded as {row['output_file']}")
+            self.stats["skipped"] += 1
+            self._handled[path] = (sig, None)
+            return "skipped"
+
+        # The plate (None) and its renditions; files uploaded by an earlier attempt are not sent again
+        parts = [None, *self.renditions]
+        done = self.manifest.uploaded_files(key) if row else {}
+        try:
+            staged = self.manifest.staged_files(key) if row and row["stage"] == STAGE_PROCESSED else {}
+            if all(p in done or p in staged for p in parts):
+                files = {p: Path(staged[p]).read_bytes() for p in parts if p not in done}
+            else:
+                logger.info(f"🎨 Processing {path.name} as {catalog} - {design_number}")
+                img = self.platemaker.process_image(data, catalog, design_number)
+                plate, _ = self.platemaker.encode(img, profile, catalog)
+                extra = self.platemaker.encode_renditions(img, self.renditions, catalog)
+                del img
+                self.manifest.record_processed(
+                    key, plate, profile_extension(profile),
+                    {n: (r["image_bytes"], profile_extension(get_rendition(n)["profile"]))
+                     for n, r in extra.items()},
+                )
+                files = {None: plate}
+                files.update((n, r["image_bytes"]) for n, r in extra.items())
+                self.stats["processed"] += 1
+            for name in parts:
+                if name in done:
+                    continue
+                r_profile = profile if name is None else get_rendition(name)["profile"]
+                folder = catalog if name is None else rendition_folder(catalog, name)
+                filename = output_filename(catalog, design_number, r_profile)
+                url = self.uploader.upload_image(files[name], filename, folder,
+                                                 mimetype=profile_mimetype(r_profile))
+                self.manifest.record_file_uploaded(key, name, filename, url)
+                done[name] = {"output_file": filename, "drive_url": url}
+            url = done[None]["drive_url"]
+            self.manifest.record_uploaded(key, done[None]["output_file"], url)
+        except Exception as e:
+            logger.error(f"❌ {path.name} failed: {str(e)}")
+            self.manifest.record_failed(key, e)
+            self.stats["failed"] += 1
+            self._handled[path] = (sig, time.time() + self.retry_s)
+            return "failed"
+
+        logger.info(f"✅ {path.name} -> {url}")
+        self.stats["uploaded"] += 1
+        self._handled[path] = (sig, None)
+        return "uploaded"
+
+    def run_once(self):
+        """One scan; returns the number of files handled"""
+        ready = self.scan()
+        for path in ready:
+            try:
+                self.process_file(path)
+            except OSError as e:
+                # Deleted or locked between scan and read; it is picked up again if it returns
+                logger.warning(f"Could not read {path.name}: {str(e)}")
+                self._settling.pop(path, None)
+        if ready:
+            self.export_stages()
+        return len(ready)
+
+    def export_stages(self):
+        """Write the stage log and metrics file, if configured"""
+        recorder = self.platemaker.recorder
+        try:
+            if self.stage_log:
+                recorder.to_jsonl(self.stage_log, append=True)
+            if self.metrics_file:
+                recorder.to_prometheus(self.metrics_file)
+        except OSError as e:
+            logger.warning(f"Could not export stage metrics: {str(e)}")
+
+    def run_forever(self, stop_event=None):
+        stop_event = stop_event or threading.Event()
+        logger.info(f"👀 Watching {self.watch_dir} (settle {self.settle_s:g}s, poll {self.poll_s:g}s)")
+        while not stop_event.is_set():
+            try:
+                handled = self.run_once()
+            except Exception as e:
+                logger.error(f"Scan failed: {str(e)}", exc_info=True)
+                handled = 0
+            # Keep draining without sleeping while files keep arriving
+            if not handled:
+                stop_event.wait(self.poll_s)
+        logger.info(f"Stopped watching; {self.stats}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Watch a folder and turn new photos into plates.")
+    parser.add_argument("watch_dir", help="directory the studio exports into")
+    parser.add_argument("--output-dir", help="write plates here instead of uploading to Google Drive")
+    parser.add_argument("--manifest", default="batch_manifest.sqlite3", help="checkpoint database")
+    parser.add_argument("--upload-chunk-mb", type=float, default=4.0,
+                        help="resumable upload chunk size; smaller chunks lose less on a dropped connection")
+    parser.add_argument("--profile", default=None, choices=list(OUTPUT_PROFILES),
+                        help="output profile for every plate")
+    parser.add_argument("--renditions", nargs="*", default=[], choices=list(RENDITIONS),
+                        help="extra sizes uploaded to sibling folders")
+    parser.add_argument("--settle", type=float, default=5.0,
+                        help="seconds a file must stay unchanged before it is processed")
+    parser.add_argument("--poll", type=float, default=2.0, help="seconds between scans")
+    parser.add_argument("--retry", type=float, default=300.0, help="seconds before a failed file is retried")
+    parser.add_argument("--recursive", action="store_true", help="also watch subdirectories")
+    parser.add_argument("--model", default=DEFAULT_MODEL, choices=list(SEGMENTATION_MODELS),
+                        help="segmentation model (u2netp for quick proofs)")
+    parser.add_argument("--intra-op-threads", type=int, default=None,
+                        help="ONNX Runtime threads per inference (default: ONNX Runtime's own choice, all cores)")
+    parser.add_argument("--inter-op-threads", type=int, default=None,
+                        help="ONNX Runtime threads running independent graph nodes")
+    parser.add_argument("--graph-optimization", choices=GRAPH_OPTIMIZATION_LEVELS, default="all")
+    parser.add_argument("--seg-proxy-size", type=int, default=None,
+                        help="segment on a proxy of at most this many pixels on the long side")
+    parser.add_argument("--cache-dir", default=".bg_cache",
+                        help="background-removal cache directory ('' to disable)")
+    parser.add_argument("--once", action="store_true",
+                        help="process what is in the folder now and exit (no settle wait; for cron)")
+    parser.add_argument("--credentials", default=None,
+                        help="Google OAuth client file (default: credentials.json next to this script)")
+    parser.add_argument("--stage-log", default=None,
+                        help="append one JSON line per pipeline stage run to this file")
+    parser.add_argument("--metrics-file", default=None,
+                        help="keep per-stage timings in Prometheus text format in this file "
+                             "(e.g. for node_exporter's textfile collector)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="record each stage's tracemalloc peak (slows processing)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(stream=sys.stderr, level=logging.INFO,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    watch_dir = Path(args.watch_dir).expanduser().resolve()
+    output_dir = Path(args.output_dir).expanduser().resolve() if args.output_dir else None
+    manifest_path = Path(args.manifest).expanduser().resolve()
+    credentials = Path(args.credentials).expanduser().resolve() if args.credentials else "credentials.json"
+    stage_log = Path(args.stage_log).expanduser().resolve() if args.stage_log else None
+    metrics_file = Path(args.metrics_file).expanduser().resolve() if args.metrics_file else None
+    # Asset paths in PlateMaker are relative to the repo
+    os.chdir(Path(__file__).resolve().parent)
+
+    from platemaker_module import PlateMaker
+
+    if output_dir:
+        from local_uploader import LocalUploader
+        uploader = LocalUploader(output_dir)
+    else:
+        from google_drive_uploader import DriveUploader
+        uploader = DriveUploader(str(credentials), chunk_size=int(args.upload_chunk_mb * 1024 * 1024))
+
+    watcher = FolderWatcher(
+        PlateMaker(
+            model_name=args.model,
+            cache_dir=args.cache_dir or None,
+            seg_proxy_size=args.seg_proxy_size,
+            intra_op_threads=args.intra_op_threads,
+            inter_op_threads=args.inter_op_threads,
+            graph_optimization=args.graph_optimization,
+            trace_memory=args.trace_memory,
+        ),
+        uploader,
+        watch_dir,
+        BatchManifest(manifest_path, staging_dir=manifest_path.parent / ".batch_outputs"),
+        profile=args.profile,
+        renditions=args.renditions,
+        settle_s=args.settle,
+        poll_s=args.poll,
+        retry_s=args.retry,
+        recursive=args.recursive,
+        stage_log=stage_log,
+        metrics_file=metrics_file,
+    )
+
+    if args.once:
+        watcher.settle_s = 0
+        watcher.scan()
+        watcher.run_once()
+        print(json.dumps(watcher.stats))
+        return 1 if watcher.stats["failed"] else 0
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    watcher.run_forever(stop)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())